@@ -64,14 +64,67 @@ contract CarbonCredit is ERC1155, AccessControl, Pausable {
             hasRole(MINTER_ROLE, msg.sender) || verifiedSellers[msg.sender],
             "Must be minter or verified seller"
         );
+
+        uint256 newTokenId = _recordCredit(
+            projectName,
+            verifier,
+            expiryDate,
+            amount,
+            metadataURI
+        );
+        _mint(msg.sender, newTokenId, amount, "");
+
+        return newTokenId;
+    }
+
+    function mintCreditBatch(
+        string[] memory projectNames,
+        string[] memory verifiers,
+        uint256[] memory expiryDates,
+        uint256[] memory amounts,
+        string[] memory metadataURIs
+    ) public whenNotPaused returns (uint256[] memory) {
+        require(
+            hasRole(MINTER_ROLE, msg.sender) || verifiedSellers[msg.sender],
+            "Must be minter or verified seller"
+        );
+        uint256 count = amounts.length;
+        require(
+            projectNames.length == count &&
+                verifiers.length == count &&
+                expiryDates.length == count &&
+                metadataURIs.length == count,
+            "Array length mismatch"
+        );
+
+        uint256[] memory tokenIds = new uint256[](count);
+        for (uint256 i = 0; i < count; i++) {
+            tokenIds[i] = _recordCredit(
+                projectNames[i],
+                verifiers[i],
+                expiryDates[i],
+                amounts[i],
+                metadataURIs[i]
+            );
+        }
+        _mintBatch(msg.sender, tokenIds, amounts, "");
+
+        return tokenIds;
+    }
+
+    function _recordCredit(
+        string memory projectName,
+        string memory verifier,
+        uint256 expiryDate,
+        uint256 amount,
+        string memory metadataURI
+    ) internal returns (uint256) {
         require(amount > 0, "Amount must be greater than 0");
         require(expiryDate > block.timestamp, "Invalid expiry date");
 
         _tokenIds.increment();
         uint256 newTokenId = _tokenIds.current();
 
-        _mint(msg.sender, newTokenId, amount, "");
-
         credits[newTokenId] = CreditMetadata({
             projectName: projectName,
             verifier: verifier,
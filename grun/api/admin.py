@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import User, CarbonCredit, Transaction
+from .services.inventory_service import InventoryService
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
@@ -19,10 +21,28 @@ class CustomUserAdmin(UserAdmin):
 @admin.register(CarbonCredit)
 class CarbonCreditAdmin(admin.ModelAdmin):
     list_display = ('id', 'project_name', 'owner', 'total_credits', 
-                   'available_credits', 'status', 'price_per_credit')
+                   'available_credits', 'shard_count', 'status', 'price_per_credit')
     list_filter = ('status', 'verifier')
     search_fields = ('project_name', 'owner__username', 'token_id')
-    readonly_fields = ('token_id',)
+    readonly_fields = ('token_id', 'shard_count')
+    actions = ('shard_inventory', 'unshard_inventory')
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+        # Only what the admin edited; purchases decrement available_credits with F() meanwhile
+        if form.changed_data:
+            obj.save(update_fields=[*form.changed_data, 'updated_at'])
+
+    @admin.action(description='Spread inventory over shards (hot credits)')
+    def shard_inventory(self, request, queryset):
+        for credit in queryset:
+            InventoryService.shard(credit, settings.CREDIT_SHARD_COUNT)
+
+    @admin.action(description='Fold inventory back into a single row')
+    def unshard_inventory(self, request, queryset):
+        for credit in queryset.filter(shard_count__gt=0):
+            InventoryService.shard(credit, 0)
 
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
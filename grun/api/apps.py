@@ -3,4 +3,8 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
-    name = "api"
+    name = "grun.api"
+    label = "api"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,78 @@
+from django.conf import settings
+from web3.exceptions import ContractLogicError
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _size(value) -> int:
+    """Rough ABI footprint of an argument in 32-byte words, used to bucket gas estimates"""
+    if isinstance(value, (str, bytes)):
+        return (len(value) + 31) // 32
+    if isinstance(value, (list, tuple)):
+        return len(value) + sum(_size(item) for item in value)
+    return 0
+
+
+# Calls that only write a new token's fresh slots, so their gas follows the
+# argument sizes alone and one estimate serves every call of the same shape
+STATE_INDEPENDENT_CALLS = ('mintCreditBatch',)
+
+
+class FeeOracle:
+    """EIP-1559 fees fetched once per block and gas estimated per call
+
+    Gas for the same call shape mostly depends on chain state (a transfer
+    to a first-time holder writes a fresh balance slot), so those calls are
+    estimated every time and the highest limit seen per shape is kept only
+    as a fallback for when the estimate RPC itself fails. Mints do not read
+    holder state, so their limit is reused per shape with extra headroom.
+    """
+
+    def __init__(self, w3, current_block):
+        self.w3 = w3
+        self.current_block = current_block
+        self._fees = None
+        self._fees_block = None
+        self._gas_limits = {}
+
+    def fees(self) -> dict:
+        block_number = self.current_block()
+        if self._fees_block != block_number:
+            base_fee = self.w3.eth.get_block(block_number).get('baseFeePerGas')
+            if base_fee is None:
+                # Pre-London chains only understand legacy transactions
+                fees = {'gasPrice': self.w3.eth.gas_price}
+            else:
+                priority_fee = self.w3.eth.max_priority_fee
+                fees = {
+                    'type': 2,
+                    # Headroom for the base fee to double before inclusion
+                    'maxFeePerGas': 2 * base_fee + priority_fee,
+                    'maxPriorityFeePerGas': priority_fee,
+                }
+            self._fees = fees
+            self._fees_block = block_number
+        return self._fees
+
+    def gas_limit(self, function, sender: str) -> int:
+        key = (function.fn_name, tuple(_size(arg) for arg in function.args))
+        reusable = function.fn_name in STATE_INDEPENDENT_CALLS
+        if reusable and key in self._gas_limits:
+            return self._gas_limits[key]
+        try:
+            gas_limit = int(function.estimate_gas({'from': sender}) * settings.WEB3_GAS_MARGIN)
+        except ContractLogicError:
+            # The call itself would revert; no gas limit can save it
+            raise
+        except Exception as e:
+            fallback = self._gas_limits.get(key)
+            if fallback is None:
+                raise
+            logger.warning(f"Gas estimate for {function.fn_name} failed, using {fallback}: {str(e)}")
+            return fallback
+        if reusable:
+            # Served without an estimate from now on, so it carries extra headroom
+            gas_limit = int(gas_limit * settings.WEB3_CACHED_GAS_MARGIN)
+        self._gas_limits[key] = max(gas_limit, self._gas_limits.get(key, 0))
+        return gas_limit
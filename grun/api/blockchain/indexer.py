@@ -0,0 +1,197 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from web3 import Web3
+from ..models import ChainBalance, ChainEvent, ChainRetirement, ChainToken, IndexerCursor
+from .web3_handler import get_web3_handler, to_int
+import logging
+
+logger = logging.getLogger(__name__)
+
+CURSOR_NAME = 'carbon_credit'
+ZERO_ADDRESS = '0x' + '0' * 40
+INDEXED_EVENTS = ('CreditMinted', 'CreditRetired', 'TransferSingle', 'TransferBatch')
+
+
+class EventIndexer:
+    """Mirrors CarbonCredit contract logs into the chain_* tables from a persisted cursor"""
+
+    def __init__(self):
+        self.web3_handler = get_web3_handler()
+        self.w3 = self.web3_handler.w3
+        self.contract = self.web3_handler.contract
+        self.events = {}
+        for item in self.contract.abi:
+            if item.get('type') == 'event' and item['name'] in INDEXED_EVENTS:
+                signature = f"{item['name']}({','.join(i['type'] for i in item['inputs'])})"
+                topic = Web3.to_hex(Web3.keccak(text=signature))
+                self.events[topic] = self.contract.events[item['name']]()
+                if item['name'] == 'CreditMinted':
+                    self.minted_topic = topic
+        self.metadata = {}
+
+    def _cursor(self) -> IndexerCursor:
+        cursor, _ = IndexerCursor.objects.get_or_create(
+            name=CURSOR_NAME,
+            defaults={'block_number': settings.WEB3_INDEXER_START_BLOCK - 1}
+        )
+        return cursor
+
+    def _block_hash(self, block_number: int) -> str:
+        return Web3.to_hex(self.w3.eth.get_block(block_number)['hash'])
+
+    def run(self) -> int:
+        """Index the next range of confirmed blocks, returning the number of logs applied"""
+        cursor = self._cursor()
+        if cursor.block_hash and self._block_hash(cursor.block_number) != cursor.block_hash:
+            self._rewind(cursor)
+
+        head = self.web3_handler.block_number() - settings.WEB3_CONFIRMATION_BLOCKS
+        from_block = cursor.block_number + 1
+        to_block = min(head, from_block + settings.WEB3_INDEXER_BLOCK_RANGE - 1)
+        if to_block < from_block:
+            return 0
+
+        logs = self.w3.eth.get_logs({
+            'address': self.contract.address,
+            'fromBlock': from_block,
+            'toBlock': to_block,
+        })
+
+        # Metadata for every token minted in the range, in one JSON-RPC batch
+        minted = [to_int(log['topics'][1]) for log in logs if Web3.to_hex(log['topics'][0]) == self.minted_topic]
+        self.metadata = self.web3_handler.get_tokens_details(minted) if minted else {}
+
+        with transaction.atomic():
+            for log in logs:
+                self._apply(log)
+            cursor.block_number = to_block
+            cursor.block_hash = self._block_hash(to_block)
+            cursor.save()
+
+        return len(logs)
+
+    def _rewind(self, cursor: IndexerCursor) -> None:
+        """Undo everything past the reorg depth and re-index it from the new fork"""
+        fork_block = max(
+            cursor.block_number - settings.WEB3_INDEXER_REORG_DEPTH,
+            settings.WEB3_INDEXER_START_BLOCK - 1
+        )
+        logger.warning(f"Reorg detected at block {cursor.block_number}, rewinding to {fork_block}")
+
+        with transaction.atomic():
+            orphaned = ChainEvent.objects.filter(block_number__gt=fork_block)
+            for event in orphaned.order_by('-block_number', '-log_index'):
+                self._revert(event)
+            orphaned.delete()
+            cursor.block_number = fork_block
+            cursor.block_hash = self._block_hash(fork_block) if fork_block >= 0 else ''
+            cursor.save()
+
+    def _apply(self, log) -> None:
+        event = self.events.get(Web3.to_hex(log['topics'][0]))
+        if event is None:
+            return
+        decoded = event.process_log(log)
+        args = dict(decoded['args'])
+        tx_hash = Web3.to_hex(log['transactionHash'])
+
+        if decoded['event'] == 'CreditMinted':
+            metadata = self.metadata.get(args['tokenId'])
+            if metadata is None:
+                # The batch lost this call; fail the range so the next run retries it
+                raise ValueError(f"No metadata for minted token {args['tokenId']}")
+            ChainToken.objects.create(
+                token_id=args['tokenId'],
+                project_name=metadata['project_name'],
+                verifier=metadata['verifier'],
+                issuance_date=metadata['issuance_date'],
+                expiry_date=metadata['expiry_date'],
+                total_credits=metadata['total_credits'],
+                owner_address=metadata['owner'],
+                metadata_uri=metadata['metadata_uri'],
+                minted_block=log['blockNumber']
+            )
+
+        elif decoded['event'] == 'TransferSingle':
+            self._move(args['from'], args['to'], args['id'], args['value'])
+
+        elif decoded['event'] == 'TransferBatch':
+            for token_id, value in zip(args['ids'], args['values']):
+                self._move(args['from'], args['to'], token_id, value)
+
+        elif decoded['event'] == 'CreditRetired':
+            # retireCredits burns from the caller, who is the sender of the burn just before
+            burn = ChainEvent.objects.filter(
+                tx_hash=tx_hash,
+                log_index__lt=log['logIndex'],
+                event='TransferSingle'
+            ).order_by('-log_index').first()
+            retiree = burn.args['from'] if burn else ZERO_ADDRESS
+            token = ChainToken.objects.get(token_id=args['tokenId'])
+            args['retiree'] = retiree
+            args['was_retired'] = token.is_retired
+            ChainRetirement.objects.create(
+                token_id=args['tokenId'],
+                address=retiree,
+                amount=args['amount'],
+                tx_hash=tx_hash,
+                log_index=log['logIndex'],
+                block_number=log['blockNumber']
+            )
+            remaining = ChainBalance.objects.filter(
+                token_id=args['tokenId'], address=retiree
+            ).values_list('balance', flat=True).first()
+            if not remaining:
+                token.is_retired = True
+                token.save()
+
+        touched = args['ids'] if 'ids' in args else [args.get('id', args.get('tokenId'))]
+        for token_id in touched:
+            self.web3_handler.read_cache.invalidate_token(token_id)
+
+        ChainEvent.objects.create(
+            block_number=log['blockNumber'],
+            block_hash=Web3.to_hex(log['blockHash']),
+            tx_hash=tx_hash,
+            log_index=log['logIndex'],
+            event=decoded['event'],
+            args={key: self._jsonable(value) for key, value in args.items()}
+        )
+
+    def _revert(self, event: ChainEvent) -> None:
+        args = event.args
+        if event.event == 'CreditMinted':
+            ChainToken.objects.filter(token_id=args['tokenId']).delete()
+
+        elif event.event == 'TransferSingle':
+            self._move(args['to'], args['from'], args['id'], args['value'])
+
+        elif event.event == 'TransferBatch':
+            for token_id, value in zip(args['ids'], args['values']):
+                self._move(args['to'], args['from'], token_id, value)
+
+        elif event.event == 'CreditRetired':
+            ChainRetirement.objects.filter(tx_hash=event.tx_hash, log_index=event.log_index).delete()
+            ChainToken.objects.filter(token_id=args['tokenId']).update(is_retired=args['was_retired'])
+
+    @staticmethod
+    def _move(from_address: str, to_address: str, token_id: int, value: int) -> None:
+        if from_address != ZERO_ADDRESS:
+            ChainBalance.objects.filter(token_id=token_id, address=from_address).update(
+                balance=F('balance') - value
+            )
+        if to_address != ZERO_ADDRESS:
+            balance, created = ChainBalance.objects.get_or_create(
+                token_id=token_id, address=to_address, defaults={'balance': value}
+            )
+            if not created:
+                ChainBalance.objects.filter(pk=balance.pk).update(balance=F('balance') + value)
+
+    @staticmethod
+    def _jsonable(value):
+        if isinstance(value, (list, tuple)):
+            return [EventIndexer._jsonable(item) for item in value]
+        if isinstance(value, bytes):
+            return Web3.to_hex(value)
+        return value
@@ -0,0 +1,81 @@
+from django.conf import settings
+from eth_account import Account
+from web3 import Web3
+from web3.providers.eth_tester import EthereumTesterProvider
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+FUNDING_AMOUNT = Web3.to_wei(1000, 'ether')
+
+
+class LocalChainProvider(EthereumTesterProvider):
+    """eth-tester provider that is safe to share between request threads and the block miner"""
+
+    def __init__(self, ethereum_tester):
+        super().__init__(ethereum_tester)
+        self.lock = threading.RLock()
+
+    def make_request(self, method, params):
+        with self.lock:
+            return super().make_request(method, params)
+
+
+class LocalChain:
+    """In-process EVM with CarbonCredit deployed and the admin account granted its roles"""
+
+    def __init__(self, artifact_path: str, admin_address: str, block_time: float):
+        from eth_tester import EthereumTester, PyEVMBackend
+
+        self.tester = EthereumTester(PyEVMBackend())
+        self.provider = LocalChainProvider(self.tester)
+        self.w3 = Web3(self.provider)
+        self.block_time = block_time
+
+        with open(artifact_path) as f:
+            artifact = json.load(f)
+
+        deployer = self.tester.get_accounts()[0]
+        factory = self.w3.eth.contract(abi=artifact['abi'], bytecode=artifact['bytecode'])
+        receipt = self.w3.eth.wait_for_transaction_receipt(
+            factory.constructor().transact({'from': deployer})
+        )
+        self.address = receipt['contractAddress']
+
+        contract = self.w3.eth.contract(address=self.address, abi=artifact['abi'])
+        for role in (contract.functions.ADMIN_ROLE().call(), contract.functions.MINTER_ROLE().call()):
+            contract.functions.grantRole(role, admin_address).transact({'from': deployer})
+        self.w3.eth.send_transaction({'from': deployer, 'to': admin_address, 'value': FUNDING_AMOUNT})
+
+        if block_time > 0:
+            # Leave transactions in the pool until the next simulated block
+            self.tester.disable_auto_mine_transactions()
+            threading.Thread(target=self._mine, name='local-chain-miner', daemon=True).start()
+        logger.info(f"Local chain ready, CarbonCredit at {self.address}")
+
+    def _mine(self) -> None:
+        while True:
+            time.sleep(self.block_time)
+            with self.provider.lock:
+                self.tester.mine_blocks()
+
+
+_chain = None
+_chain_lock = threading.Lock()
+
+
+def get_local_chain(artifact_path: str) -> LocalChain:
+    """The process-wide local chain, deployed on first use"""
+    global _chain
+    if _chain is None:
+        with _chain_lock:
+            if _chain is None:
+                _chain = LocalChain(
+                    artifact_path,
+                    Account.from_key(settings.ADMIN_PRIVATE_KEY).address,
+                    settings.WEB3_TESTER_BLOCK_TIME
+                )
+    return _chain
@@ -0,0 +1,141 @@
+from django_redis import get_redis_connection
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Returns the next nonce, or -1 when the counter has not been seeded yet;
+# released nonces are handed out again before the counter moves on
+ALLOCATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -1
+end
+local free = redis.call('ZRANGE', KEYS[2], 0, 0)
+if #free > 0 then
+    redis.call('ZREM', KEYS[2], free[1])
+    return tonumber(free[1])
+end
+return redis.call('INCR', KEYS[1]) - 1
+"""
+
+# Winds the counter back over a nonce at its top, else parks it as free
+RELEASE_SCRIPT = """
+local nonce = tonumber(ARGV[1])
+if tonumber(redis.call('GET', KEYS[1])) ~= nonce + 1 then
+    redis.call('ZADD', KEYS[2], nonce, nonce)
+    return 0
+end
+while redis.call('ZSCORE', KEYS[2], nonce - 1) do
+    redis.call('ZREM', KEYS[2], nonce - 1)
+    nonce = nonce - 1
+end
+redis.call('SET', KEYS[1], nonce)
+return 1
+"""
+
+# Only ever moves the counter forward, to the chain's pending count, and
+# forgets free nonces the chain has already used
+RESYNC_SCRIPT = """
+local pending = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', '(' .. pending)
+local current = tonumber(redis.call('GET', KEYS[1]) or '-1')
+if current < pending then
+    redis.call('SET', KEYS[1], pending)
+    return pending
+end
+return current
+"""
+
+
+class NonceManager:
+    """Allocates account nonces atomically across processes from a shared Redis counter
+
+    Nonces signed but not yet broadcast by other workers are invisible to
+    the node, so the counter is never moved back to the node's count;
+    nonces that will not be sent are released into a free set instead and
+    reused first, which closes the gap they would otherwise leave.
+    """
+
+    def __init__(self, w3, address: str):
+        self.w3 = w3
+        self.address = address
+        self.redis = get_redis_connection('default')
+        self.key = f'web3:nonce:{address.lower()}'
+        self.free_key = f'{self.key}:free'
+        self._allocate = self.redis.register_script(ALLOCATE_SCRIPT)
+        self._release = self.redis.register_script(RELEASE_SCRIPT)
+        self._resync = self.redis.register_script(RESYNC_SCRIPT)
+
+    def _chain_nonce(self) -> int:
+        return self.w3.eth.get_transaction_count(self.address, 'pending')
+
+    def allocate(self) -> int:
+        """Reserve the next nonce without a round trip to the node"""
+        nonce = self._allocate(keys=[self.key, self.free_key])
+        if nonce < 0:
+            # First use: seed from the chain, losing the race is fine
+            self.redis.set(self.key, self._chain_nonce(), nx=True)
+            nonce = self._allocate(keys=[self.key, self.free_key])
+        return int(nonce)
+
+    def release(self, nonce: int):
+        """Return a nonce whose transaction will never reach the node"""
+        self._release(keys=[self.key, self.free_key], args=[nonce])
+
+    def peek(self):
+        """Next nonce the counter would hand out, None before it is seeded"""
+        nonce = self.redis.get(self.key)
+        return None if nonce is None else int(nonce)
+
+    def resync(self) -> int:
+        """Move the counter up to the node's pending count if the chain got ahead of it"""
+        nonce = int(self._resync(keys=[self.key, self.free_key], args=[self._chain_nonce()]))
+        logger.warning(f"Resynced nonce for {self.address} to {nonce}")
+        return nonce
+
+
+class LocalNonceManager(NonceManager):
+    """Same allocation rules kept in process memory, for the in-process eth-tester chain
+
+    Each process runs its own chain that starts empty, so a counter shared
+    through Redis would carry nonces over from other processes and runs.
+    """
+
+    def __init__(self, w3, address: str):
+        self.w3 = w3
+        self.address = address
+        self.lock = threading.Lock()
+        self.next_nonce = None
+        self.free = set()
+
+    def allocate(self) -> int:
+        with self.lock:
+            if self.free:
+                nonce = min(self.free)
+                self.free.remove(nonce)
+                return nonce
+            if self.next_nonce is None:
+                self.next_nonce = self._chain_nonce()
+            nonce = self.next_nonce
+            self.next_nonce += 1
+            return nonce
+
+    def release(self, nonce: int):
+        with self.lock:
+            if self.next_nonce != nonce + 1:
+                self.free.add(nonce)
+                return
+            while nonce - 1 in self.free:
+                self.free.remove(nonce - 1)
+                nonce -= 1
+            self.next_nonce = nonce
+
+    def peek(self):
+        return self.next_nonce
+
+    def resync(self) -> int:
+        pending = self._chain_nonce()
+        with self.lock:
+            self.free = {nonce for nonce in self.free if nonce >= pending}
+            self.next_nonce = max(self.next_nonce or 0, pending)
+            return self.next_nonce
@@ -0,0 +1,129 @@
+from django.conf import settings
+from web3 import HTTPProvider
+from web3.providers import JSONBaseProvider
+import logging
+import requests
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Sent to one pinned node so nonces are read and spent against the same mempool
+WRITE_METHODS = frozenset({'eth_sendRawTransaction', 'eth_getTransactionCount'})
+
+LATENCY_DECAY = 0.2
+
+
+class Endpoint:
+    def __init__(self, url: str, session: requests.Session):
+        self.url = url
+        self.provider = HTTPProvider(
+            url,
+            request_kwargs={'timeout': settings.WEB3_REQUEST_TIMEOUT},
+            session=session,
+        )
+        self.latency = 0.0  # EWMA in seconds; unmeasured endpoints look fastest so they get probed
+        self.errors = 0
+        self.down_until = 0.0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.down_until
+
+    def succeeded(self, elapsed: float) -> None:
+        self.latency = elapsed if not self.latency else (
+            LATENCY_DECAY * elapsed + (1 - LATENCY_DECAY) * self.latency
+        )
+        self.errors = 0
+        self.down_until = 0.0
+
+    def failed(self, now: float) -> None:
+        self.errors += 1
+        cooldown = min(settings.WEB3_ENDPOINT_COOLDOWN * 2 ** (self.errors - 1), 300)
+        self.down_until = now + cooldown
+
+
+class ProviderPool(JSONBaseProvider):
+    """Routes reads to the fastest healthy RPC endpoint and writes to a pinned one, failing over on transport errors"""
+
+    def __init__(self, urls: list, session: requests.Session):
+        super().__init__()
+        self.session = session
+        self.endpoints = [Endpoint(url, session) for url in urls]
+        self.writer = self.endpoints[0]
+        self.lock = threading.Lock()
+
+    def _candidates(self, write: bool) -> list:
+        now = time.monotonic()
+        with self.lock:
+            healthy = sorted(
+                (endpoint for endpoint in self.endpoints if endpoint.healthy(now)),
+                key=lambda endpoint: endpoint.latency
+            )
+            if write and self.writer in healthy:
+                healthy.remove(self.writer)
+                healthy.insert(0, self.writer)
+            # Endpoints cooling down are still worth a try before giving up
+            down = sorted(
+                (endpoint for endpoint in self.endpoints if not endpoint.healthy(now)),
+                key=lambda endpoint: endpoint.down_until
+            )
+        return healthy + down
+
+    def _dispatch(self, write: bool, send):
+        last_error = None
+        for endpoint in self._candidates(write):
+            start = time.monotonic()
+            try:
+                result = send(endpoint)
+            except requests.RequestException as e:
+                with self.lock:
+                    endpoint.failed(time.monotonic())
+                logger.warning(f"RPC endpoint {endpoint.url} failed: {str(e)}")
+                last_error = e
+                continue
+            with self.lock:
+                endpoint.succeeded(time.monotonic() - start)
+                if write and endpoint is not self.writer:
+                    logger.warning(f"Pinning writes to {endpoint.url}")
+                    self.writer = endpoint
+            return result
+        raise last_error
+
+    def make_request(self, method, params):
+        return self._dispatch(
+            method in WRITE_METHODS,
+            lambda endpoint: endpoint.provider.make_request(method, params)
+        )
+
+    def make_primary_request(self, method, params):
+        """Send a read to the pinned write node, which has seen every transaction we broadcast"""
+        return self._dispatch(True, lambda endpoint: endpoint.provider.make_request(method, params))
+
+    def make_batch_request(self, payload: list) -> list:
+        """POST a JSON-RPC batch to the fastest healthy endpoint"""
+        def send(endpoint):
+            response = self.session.post(
+                endpoint.url,
+                json=payload,
+                timeout=settings.WEB3_REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+            return response.json()
+
+        return self._dispatch(False, send)
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        return any(endpoint.provider.is_connected() for endpoint in self.endpoints)
+
+    def stats(self) -> list:
+        with self.lock:
+            return [
+                {
+                    'url': endpoint.url,
+                    'latency_ms': round(endpoint.latency * 1000, 1),
+                    'errors': endpoint.errors,
+                    'healthy': endpoint.healthy(time.monotonic()),
+                    'writer': endpoint is self.writer,
+                }
+                for endpoint in self.endpoints
+            ]
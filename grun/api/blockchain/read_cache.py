@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from django.core.cache import cache
+import threading
+
+MISSING = object()
+
+TOKEN_GENERATION_PREFIX = 'web3:token-generation:'
+
+
+def invalidate_token(token_id: int) -> None:
+    """Make every process's cached reads of a token stale by moving its shared generation"""
+    key = f'{TOKEN_GENERATION_PREFIX}{token_id}'
+    cache.add(key, 0, None)
+    cache.incr(key)
+
+
+class BlockAwareCache:
+    """Bounded LRU of contract reads, each entry valid only for the block it was read at
+
+    Entries also carry their token's generation, a counter in the shared
+    cache, so invalidate_token() in one process (the indexer's Celery
+    worker) makes every other process's entries for that token stale too.
+    Keys are (kind, token_id, ...).
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _generations(token_ids) -> dict:
+        keys = {token_id: f'{TOKEN_GENERATION_PREFIX}{token_id}' for token_id in token_ids}
+        found = cache.get_many(list(keys.values()))
+        return {token_id: found.get(key, 0) for token_id, key in keys.items()}
+
+    def get(self, key: tuple, block_number: int):
+        return self.get_many([key], block_number).get(key, MISSING)
+
+    def get_many(self, keys: list, block_number: int) -> dict:
+        """Values still valid at block_number, with one round trip for their generations"""
+        generations = self._generations({key[1] for key in keys})
+        found = {}
+        with self.lock:
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is None or entry[0] != block_number or entry[1] != generations[key[1]]:
+                    self.misses += 1
+                    continue
+                self.entries.move_to_end(key)
+                self.hits += 1
+                found[key] = entry[2]
+        return found
+
+    def set(self, key: tuple, value, block_number: int) -> None:
+        self.set_many({key: value}, block_number)
+
+    def set_many(self, values: dict, block_number: int) -> None:
+        # A value read at a fixed block cannot change, so taking the generation
+        # after the read only risks keeping a correct entry a little longer
+        generations = self._generations({key[1] for key in values})
+        with self.lock:
+            for key, value in values.items():
+                self.entries[key] = (block_number, generations[key[1]], value)
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate_token(self, token_id: int) -> None:
+        """Make every process's entries for a token stale, and drop this one's"""
+        invalidate_token(token_id)
+        with self.lock:
+            for entry_key in [entry_key for entry_key in self.entries if entry_key[1] == token_id]:
+                del self.entries[entry_key]
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
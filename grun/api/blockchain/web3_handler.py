@@ -1,39 +1,113 @@
 from web3 import Web3
 from web3.middleware import geth_poa_middleware
 from eth_account import Account
+from hexbytes import HexBytes
 from django.conf import settings
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
 import json
 import logging
-from datetime import datetime
+import os
+import requests
+import threading
+import time
+from datetime import datetime, timezone
+from .fee_oracle import FeeOracle
+from .local_chain import get_local_chain
+from .nonce_manager import LocalNonceManager, NonceManager
+from .provider_pool import ProviderPool
+from .read_cache import MISSING, BlockAwareCache
 
 logger = logging.getLogger(__name__)
 
+CONTRACT_ARTIFACT = 'contracts/CarbonCredit.json'
+
+
+@lru_cache(maxsize=None)
+def load_contract_abi(path: str = CONTRACT_ARTIFACT):
+    """Parse the compiled contract artifact once per process"""
+    with open(path) as f:
+        return json.load(f)['abi']
+
+
+def to_int(value) -> int:
+    """Integer from a JSON-RPC quantity, whether it arrives hex-encoded or already decoded"""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        return int.from_bytes(value, 'big')
+    return int(value, 16)
+
+
+def abi_type(param: dict) -> str:
+    """Canonical type string for an ABI parameter, expanding tuples into their components"""
+    if not param['type'].startswith('tuple'):
+        return param['type']
+    components = ','.join(abi_type(component) for component in param['components'])
+    return f"({components}){param['type'][len('tuple'):]}"
+
+
+@lru_cache(maxsize=None)
+def load_admin_account(private_key: str):
+    return Account.from_key(private_key)
+
+
+def build_session() -> requests.Session:
+    """HTTP session that keeps connections to the RPC node alive between calls"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=len(settings.WEB3_PROVIDER_URLS),
+        pool_maxsize=settings.WEB3_POOL_SIZE
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
 class Web3Handler:
     def __init__(self):
-        self.w3 = Web3(Web3.HTTPProvider(settings.WEB3_PROVIDER_URL))
+        self.session = build_session()
+        contract_address = settings.CONTRACT_ADDRESS
+        if settings.WEB3_BACKEND == 'tester':
+            local_chain = get_local_chain(CONTRACT_ARTIFACT)
+            self.provider = local_chain.provider
+            contract_address = local_chain.address
+        else:
+            self.provider = ProviderPool(settings.WEB3_PROVIDER_URLS, self.session)
+        self.w3 = Web3(self.provider)
         self.w3.middleware_onion.inject(geth_poa_middleware, layer=0)
         
-        # Load contract ABI and address
-        with open('contracts/CarbonCredit.json') as f:
-            contract_data = json.load(f)
-        
         self.contract = self.w3.eth.contract(
-            address=settings.CONTRACT_ADDRESS,
-            abi=contract_data['abi']
+            address=contract_address,
+            abi=load_contract_abi()
+        )
+        self.metadata_output_types = [
+            abi_type(output)
+            for output in self.contract.get_function_by_name('getCreditMetadata').abi['outputs']
+        ]
+        self.credit_minted_topic = Web3.to_hex(
+            Web3.keccak(text='CreditMinted(uint256,string,address,uint256)')
         )
         
         # Load admin account
-        self.admin_account = Account.from_key(settings.ADMIN_PRIVATE_KEY)
+        self.admin_account = load_admin_account(settings.ADMIN_PRIVATE_KEY)
+        nonce_manager_class = LocalNonceManager if settings.WEB3_BACKEND == 'tester' else NonceManager
+        self.nonce_manager = nonce_manager_class(self.w3, self.admin_account.address)
 
-    def _build_transaction(self, function):
-        """Helper method to build transaction with proper gas estimation"""
-        nonce = self.w3.eth.get_transaction_count(self.admin_account.address)
-        
+        self.read_cache = BlockAwareCache(settings.WEB3_READ_CACHE_SIZE)
+        self._head = None
+        self._head_checked_at = float('-inf')
+        self.chain_id = self.w3.eth.chain_id
+        self.fee_oracle = FeeOracle(self.w3, self.current_block)
+
+    def _build_transaction(self, function, nonce: int):
+        """Helper method to build a signed transaction with cached gas and fee parameters"""
         transaction = function.build_transaction({
             'from': self.admin_account.address,
             'nonce': nonce,
-            'gas': 2000000,  # Estimate gas limit
-            'gasPrice': self.w3.eth.gas_price,
+            'chainId': self.chain_id,
+            'gas': self.fee_oracle.gas_limit(function, self.admin_account.address),
+            **self.fee_oracle.fees(),
         })
         
         signed_txn = self.w3.eth.account.sign_transaction(
@@ -42,103 +116,244 @@ class Web3Handler:
         
         return signed_txn
 
-    async def create_token(self, project_name: str, verifier: str, expiry_date: datetime,
-                         total_credits: int, owner_address: str, metadata_uri: str):
-        """Mint new carbon credits"""
+    def sign_transaction(self, function):
+        """Sign a contract call with the next nonce without broadcasting it
+
+        Returns the tx hash, raw transaction and nonce so callers can persist
+        them before sending and rebroadcast the exact same bytes if the send is lost.
+        """
+        nonce = self.nonce_manager.allocate()
         try:
-            expiry_timestamp = int(expiry_date.timestamp())
-            
-            function = self.contract.functions.mintCredit(
-                project_name,
-                verifier,
-                expiry_timestamp,
-                total_credits,
-                metadata_uri
-            )
-            
-            signed_txn = self._build_transaction(function)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            
-            # Wait for transaction receipt
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-            
-            # Get token ID from event logs
-            event = self.contract.events.CreditMinted().process_receipt(receipt)[0]
-            return event['args']['tokenId'], self.w3.to_hex(tx_hash)
-            
-        except Exception as e:
-            logger.error(f"Error creating token: {str(e)}")
+            signed_txn = self._build_transaction(function, nonce)
+        except Exception:
+            self.nonce_manager.release(nonce)
             raise
+        return self.w3.to_hex(signed_txn.hash), self.w3.to_hex(signed_txn.rawTransaction), nonce
 
-    async def get_token_details(self, token_id: int):
-        """Fetch token metadata from blockchain"""
+    def broadcast(self, raw_transaction: str) -> None:
+        """Send a signed transaction; re-sending one the node already has is a no-op"""
         try:
-            metadata = await self.contract.functions.getCreditMetadata(token_id).call()
-            return {
-                'project_name': metadata[0],
-                'verifier': metadata[1],
-                'issuance_date': datetime.fromtimestamp(metadata[2]),
-                'expiry_date': datetime.fromtimestamp(metadata[3]),
-                'total_credits': metadata[4],
-                'owner': metadata[5],
-                'is_retired': metadata[6],
-                'metadata_uri': metadata[7]
-            }
-        except Exception as e:
-            logger.error(f"Error fetching token details: {str(e)}")
+            self.w3.eth.send_raw_transaction(raw_transaction)
+        except ValueError as e:
+            message = str(e).lower()
+            if 'already known' in message or 'known transaction' in message:
+                return
             raise
 
-    async def transfer_token(self, token_id: int, from_address: str,
-                           to_address: str, amount: int):
-        """Transfer tokens between addresses"""
+    def mint_batch_call(self, credits: list):
+        return self.contract.functions.mintCreditBatch(
+            [credit['project_name'] for credit in credits],
+            [credit['verifier'] for credit in credits],
+            [credit['expiry_timestamp'] for credit in credits],
+            [credit['amount'] for credit in credits],
+            [credit['metadata_uri'] for credit in credits]
+        )
+
+    def transfer_batch_call(self, from_address: str, to_address: str,
+                            token_ids: list, amounts: list):
+        return self.contract.functions.safeBatchTransferFrom(
+            from_address,
+            to_address,
+            token_ids,
+            amounts,
+            b''  # No data
+        )
+
+    def _batch_request(self, calls):
+        """Send several JSON-RPC calls in a single HTTP round trip"""
+        payload = [
+            {'jsonrpc': '2.0', 'id': i, 'method': method, 'params': params}
+            for i, (method, params) in enumerate(calls)
+        ]
+        if not payload:
+            return []
+        if hasattr(self.provider, 'make_batch_request'):
+            replies = {reply['id']: reply for reply in self.provider.make_batch_request(payload)}
+        else:
+            # In-process backends have no HTTP hop worth saving, so just call in turn
+            replies = {}
+            for request in payload:
+                try:
+                    result = self.w3.manager.request_blocking(request['method'], request['params'])
+                    replies[request['id']] = {'result': result}
+                except Exception as e:
+                    replies[request['id']] = {'error': str(e)}
+        results = []
+        for i, (method, params) in enumerate(calls):
+            reply = replies.get(i, {})
+            if 'error' in reply:
+                logger.warning(f"{method} failed in batch: {reply['error']}")
+            results.append(reply.get('result'))
+        return results
+
+    def block_number(self) -> int:
+        return self.w3.eth.block_number
+
+    def current_block(self) -> int:
+        """Latest block number, asked of the node at most once per block time"""
+        now = time.monotonic()
+        if now - self._head_checked_at >= settings.WEB3_BLOCK_TIME:
+            self._head = self.w3.eth.block_number
+            self._head_checked_at = now
+        return self._head
+
+    def get_receipts(self, tx_hashes: list):
+        """Fetch receipts for many transactions at once, None for those not yet mined"""
+        return self._batch_request([
+            ('eth_getTransactionReceipt', [tx_hash]) for tx_hash in tx_hashes
+        ])
+
+    def _primary_request(self, method: str, params: list):
+        if hasattr(self.provider, 'make_primary_request'):
+            response = self.provider.make_primary_request(method, params)
+        else:
+            response = self.provider.make_request(method, params)
+        if response.get('error'):
+            raise ValueError(response['error'])
+        return response.get('result')
+
+    def lookup_transaction(self, tx_hash: str) -> tuple:
+        """(receipt, transaction) as the write node sees them
+
+        Read replicas can lag; the node our transactions were sent through
+        cannot have missed them. Either part is None when unknown.
+        """
+        receipt = self._primary_request('eth_getTransactionReceipt', [tx_hash])
+        if receipt is not None:
+            return receipt, None
+        return None, self._primary_request('eth_getTransactionByHash', [tx_hash])
+
+    def confirmed_nonce(self) -> int:
+        """Number of the admin account's transactions mined so far, per the write node"""
+        return to_int(self._primary_request('eth_getTransactionCount', [self.admin_account.address, 'latest']))
+
+    def pending_nonce(self) -> int:
+        """Next nonce the write node expects from the admin account, counting its mempool"""
+        return to_int(self._primary_request('eth_getTransactionCount', [self.admin_account.address, 'pending']))
+
+    def send_noop(self, nonce: int) -> str:
+        """Spend a nonce on an empty transfer to ourselves so the transactions after it can be mined"""
+        signed_txn = self.w3.eth.account.sign_transaction({
+            'from': self.admin_account.address,
+            'to': self.admin_account.address,
+            'value': 0,
+            'nonce': nonce,
+            'chainId': self.chain_id,
+            'gas': 21000,
+            **self.fee_oracle.fees(),
+        }, settings.ADMIN_PRIVATE_KEY)
+        self.broadcast(self.w3.to_hex(signed_txn.rawTransaction))
+        return self.w3.to_hex(signed_txn.hash)
+
+    def minted_token_ids(self, receipt: dict):
+        """Token IDs from the CreditMinted logs of a raw receipt, in log order"""
+        return [
+            to_int(log['topics'][1])
+            for log in receipt['logs']
+            if log['topics'] and Web3.to_hex(HexBytes(log['topics'][0])) == self.credit_minted_topic
+        ]
+
+    def get_token_details(self, token_id: int):
+        """Fetch token metadata from blockchain, cached for the current block"""
+        block_number = self.current_block()
+        key = ('metadata', token_id)
+        details = self.read_cache.get(key, block_number)
+        if details is not MISSING:
+            return details
         try:
-            function = self.contract.functions.safeTransferFrom(
-                from_address,
-                to_address,
-                token_id,
-                amount,
-                b''  # No data
+            metadata = self.contract.functions.getCreditMetadata(token_id).call(
+                block_identifier=block_number
             )
-            
-            signed_txn = self._build_transaction(function)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            
-            await self.w3.eth.wait_for_transaction_receipt(tx_hash)
-            return self.w3.to_hex(tx_hash)
-            
+            details = self._format_metadata(metadata)
         except Exception as e:
-            logger.error(f"Error transferring token: {str(e)}")
+            logger.error(f"Error fetching token details: {str(e)}")
             raise
+        self.read_cache.set(key, details, block_number)
+        return details
+
+    @staticmethod
+    def _format_metadata(metadata):
+        return {
+            'project_name': metadata[0],
+            'verifier': metadata[1],
+            'issuance_date': datetime.fromtimestamp(metadata[2], tz=timezone.utc),
+            'expiry_date': datetime.fromtimestamp(metadata[3], tz=timezone.utc),
+            'total_credits': metadata[4],
+            'owner': metadata[5],
+            'is_retired': metadata[6],
+            'metadata_uri': metadata[7]
+        }
 
-    async def retire_token(self, token_id: int, amount: int):
-        """Retire (burn) tokens"""
+    def get_balance(self, address: str, token_id: int) -> int:
+        """Token balance of an address, cached for the current block"""
+        block_number = self.current_block()
+        key = ('balance', token_id, address.lower())
+        balance = self.read_cache.get(key, block_number)
+        if balance is not MISSING:
+            return balance
         try:
-            function = self.contract.functions.retireCredits(token_id, amount)
-            
-            signed_txn = self._build_transaction(function)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            
-            await self.w3.eth.wait_for_transaction_receipt(tx_hash)
-            return self.w3.to_hex(tx_hash)
-            
+            balance = self.contract.functions.balanceOf(address, token_id).call(
+                block_identifier=block_number
+            )
         except Exception as e:
-            logger.error(f"Error retiring token: {str(e)}")
+            logger.error(f"Error fetching token balance: {str(e)}")
             raise
+        self.read_cache.set(key, balance, block_number)
+        return balance
+
+    def get_tokens_details(self, token_ids: list) -> dict:
+        """Fetch metadata for many tokens in one JSON-RPC batch, keyed by token ID"""
+        block_number = self.current_block()
+        token_ids = list(dict.fromkeys(token_ids))
+        cached = self.read_cache.get_many([('metadata', token_id) for token_id in token_ids], block_number)
+        details = {key[1]: value for key, value in cached.items()}
+        missing = [token_id for token_id in token_ids if token_id not in details]
 
-    async def verify_seller(self, seller_address: str):
-        """Verify a seller address"""
         try:
-            function = self.contract.functions.verifyOrUnverifySeller(
-                seller_address,
-                True
-            )
-            
-            signed_txn = self._build_transaction(function)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            
-            await self.w3.eth.wait_for_transaction_receipt(tx_hash)
-            return self.w3.to_hex(tx_hash)
-            
+            results = self._batch_request([
+                ('eth_call', [
+                    {
+                        'to': self.contract.address,
+                        'data': self.contract.encodeABI(fn_name='getCreditMetadata', args=[token_id]),
+                    },
+                    hex(block_number)
+                ])
+                for token_id in missing
+            ])
         except Exception as e:
-            logger.error(f"Error verifying seller: {str(e)}")
-            raise 
\ No newline at end of file
+            logger.error(f"Error fetching token details batch: {str(e)}")
+            raise
+
+        fetched = {}
+        for token_id, result in zip(missing, results):
+            if result is None:
+                continue
+            (metadata,) = self.w3.codec.decode(self.metadata_output_types, bytes(HexBytes(result)))
+            details[token_id] = fetched[('metadata', token_id)] = self._format_metadata(metadata)
+        if fetched:
+            self.read_cache.set_many(fetched, block_number)
+        return details
+
+
+_handler = None
+_handler_lock = threading.Lock()
+
+
+def get_web3_handler() -> Web3Handler:
+    """Return the process-wide Web3Handler, building it on first use"""
+    global _handler
+    if _handler is None:
+        with _handler_lock:
+            if _handler is None:
+                _handler = Web3Handler()
+    return _handler
+
+
+def _reset_after_fork():
+    # Sockets in the pool belong to the parent; prefork children must dial their own
+    global _handler, _handler_lock
+    _handler = None
+    _handler_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
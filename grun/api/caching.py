@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .streaming import publish_listing_delta
+import hashlib
+import time
+
+LISTINGS_GENERATION_KEY = 'listings:generation'
+
+
+def bump_listings_generation() -> None:
+    """Make every cached listings page stale"""
+    cache.add(LISTINGS_GENERATION_KEY, 0, None)
+    cache.incr(LISTINGS_GENERATION_KEY)
+
+
+def listings_generation() -> int:
+    return cache.get(LISTINGS_GENERATION_KEY, 0)
+
+
+def listings_changed(credit_id=None) -> None:
+    """Bump the generation, and push credit_id's delta to streams, once the current transaction commits
+
+    Bumping earlier would let a reader recompute a page from the old rows
+    and store it under the new generation. Streams are best effort, so a
+    failed publish is logged rather than raised into the committed request.
+    """
+    transaction.on_commit(bump_listings_generation)
+    if credit_id is not None:
+        transaction.on_commit(lambda: publish_listing_delta(credit_id), robust=True)
+
+
+def normalise_query(query_params, allowed: tuple) -> str:
+    """Canonical form of the parameters that change a listing, in a fixed order"""
+    parts = []
+    for name in sorted(allowed):
+        values = sorted(value for value in query_params.getlist(name) if value != '')
+        parts.extend(f'{name}={value}' for value in values)
+    return '&'.join(parts)
+
+
+def cached_listing(query: str, compute):
+    """Serve a listing page from Redis, recomputing it in only one worker at a time
+
+    The page entry and the generation are fetched in one round trip. When a
+    page is stale the worker that wins the lock recomputes it while the
+    others keep serving the previous copy; with no copy at all they wait for
+    the winner rather than all hitting the database. Returns the
+    generation of the copy served along with it, so a stale copy is never
+    tagged as the current one.
+    """
+    key = f'listings:page:{hashlib.sha1(query.encode()).hexdigest()}'
+    values = cache.get_many([LISTINGS_GENERATION_KEY, key])
+    generation = values.get(LISTINGS_GENERATION_KEY, 0)
+    entry = values.get(key)
+    if entry and entry['generation'] == generation and entry['expires_at'] > time.time():
+        return generation, entry['data']
+
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, settings.LISTINGS_CACHE_LOCK_TIMEOUT):
+        try:
+            data = compute()
+            cache.set(
+                key,
+                {'generation': generation, 'expires_at': time.time() + settings.LISTINGS_CACHE_TTL, 'data': data},
+                # Kept past its expiry so there is something to serve while it is refreshed
+                settings.LISTINGS_CACHE_TTL * 2
+            )
+        finally:
+            cache.delete(lock_key)
+        return generation, data
+
+    if entry:
+        return entry['generation'], entry['data']
+
+    deadline = time.monotonic() + settings.LISTINGS_CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry and entry['generation'] >= generation:
+            return entry['generation'], entry['data']
+    return generation, compute()
@@ -0,0 +1,46 @@
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from functools import wraps
+from .caching import normalise_query
+from .fieldsets import EXPAND_PARAM, FIELDS_PARAM
+import hashlib
+
+
+def make_etag(request, version: str) -> str:
+    # The same data rendered as JSON or as the browsable API, or with a
+    # different field selection, is a different representation
+    selection = normalise_query(request.query_params, (FIELDS_PARAM, EXPAND_PARAM))
+    raw = f'{version}|{request.accepted_media_type}|{selection}'
+    return quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+
+
+def conditional(view_method):
+    """Answer If-None-Match / If-Modified-Since on a view method before it does any work
+
+    The view's get_validators(request, *args, **kwargs) returns a
+    (version, last_modified) pair from cheap lookups such as updated_at or
+    the listings generation; either may be None. When the client already
+    holds that version a 304 goes back without running the queryset or the
+    serializer. A view serving a cached copy older than that version sets
+    the copy's own ETag instead. Responses are per user, so shared caches
+    must not keep them and browsers revalidate every time.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        version, last_modified = self.get_validators(request, *args, **kwargs)
+        etag = make_etag(request, version) if version is not None else None
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = view_method(self, request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            if etag and not response.has_header('ETag'):
+                response['ETag'] = etag
+            if timestamp and not response.has_header('Last-Modified'):
+                response['Last-Modified'] = http_date(timestamp)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    return wrapper
@@ -18,4 +18,14 @@ class StorageError(APIException):
 class SecurityError(APIException):
     status_code = 403
     default_detail = 'Security check failed'
-    default_code = 'security_error' 
\ No newline at end of file
+    default_code = 'security_error' 
+
+class InsufficientCreditsError(APIException):
+    status_code = 409
+    default_detail = 'Insufficient credits available'
+    default_code = 'insufficient_credits'
+
+class CreditNotMintedError(APIException):
+    status_code = 409
+    default_detail = 'Credit has no token on chain yet'
+    default_code = 'credit_not_minted'
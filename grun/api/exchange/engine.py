@@ -0,0 +1,236 @@
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django_redis import get_redis_connection
+from redis.exceptions import ResponseError
+from ..exceptions import InsufficientCreditsError
+from ..models import CarbonCredit, Order, Transaction, User
+from ..services.inventory_service import InventoryService
+from ..services.outbox_service import OutboxService
+from .order_book import BookOrder, OrderBook
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+COMMAND_STREAM = 'exchange:commands'
+CONSUMER_GROUP = 'matching-engine'
+BOOK_KEY = 'exchange:book:{}'
+
+
+def decode(fields: dict) -> dict:
+    return {
+        (key.decode() if isinstance(key, bytes) else key): (value.decode() if isinstance(value, bytes) else value)
+        for key, value in fields.items()
+    }
+
+
+class MatchingEngine:
+    """Single-threaded matcher fed from a Redis stream
+
+    Books live in memory and every batch of commands is persisted in one
+    database transaction before it is acknowledged, so open orders in
+    Postgres are always a consistent snapshot to recover the books from.
+    """
+
+    def __init__(self, consumer: str):
+        self.redis = get_redis_connection('default')
+        self.consumer = consumer
+        self.books = {}
+        self.credits = {}
+        self.sequence = 0
+
+    def recover(self) -> None:
+        """Rebuild every book from the open orders in Postgres"""
+        self.books = {}
+        self.credits = {}
+        self.sequence = Order.objects.aggregate(sequence=Max('sequence'))['sequence'] or 0
+        open_orders = Order.objects.filter(status='OPEN').order_by('sequence').iterator()
+        for order in open_orders:
+            self._book(str(order.carbon_credit_id)).rest(BookOrder(
+                str(order.id), order.user_id, order.side, order.price, order.remaining, order.sequence
+            ))
+        logger.info(f"Recovered {len(self.books)} order books at sequence {self.sequence}")
+
+    def run(self) -> None:
+        try:
+            self.redis.xgroup_create(COMMAND_STREAM, CONSUMER_GROUP, id='0', mkstream=True)
+        except ResponseError:
+            pass  # Group already exists
+        self.recover()
+
+        # Commands read before a crash but never acknowledged are replayed first
+        pending = True
+        while pending:
+            pending = self._read('0', block=None)
+        while True:
+            self._read('>', block=1000)
+
+    def _read(self, start: str, block) -> bool:
+        response = self.redis.xreadgroup(
+            CONSUMER_GROUP, self.consumer, {COMMAND_STREAM: start},
+            count=settings.EXCHANGE_BATCH_SIZE, block=block
+        )
+        messages = response[0][1] if response else []
+        if not messages:
+            return False
+        try:
+            self.process([decode(fields) for _, fields in messages])
+        except Exception as e:
+            logger.error(f"Order batch failed, replaying one by one: {str(e)}")
+            # The books may hold changes that never reached Postgres
+            self.recover()
+            for _, fields in messages:
+                try:
+                    self.process([decode(fields)])
+                except Exception as e:
+                    logger.error(f"Dropping order command {fields}: {str(e)}")
+                    self.recover()
+        self.redis.xack(COMMAND_STREAM, CONSUMER_GROUP, *[message_id for message_id, _ in messages])
+        return True
+
+    def _book(self, credit_id) -> OrderBook:
+        book = self.books.get(credit_id)
+        if book is None:
+            book = self.books[credit_id] = OrderBook()
+        return book
+
+    def _load_credits(self, commands: list) -> None:
+        """Read the batch's credits afresh; verification can be revoked and owners change at any time"""
+        credit_ids = {command['carbon_credit_id'] for command in commands if command['type'] == 'place'}
+        self.credits = {
+            str(credit.pk): credit
+            for credit in CarbonCredit.objects.select_related('owner').filter(pk__in=credit_ids)
+        }
+
+    def process(self, commands: list) -> None:
+        """Apply a batch of commands and persist the result in one transaction"""
+        placed_ids = [command['id'] for command in commands if command['type'] == 'place']
+        # A crash between commit and acknowledgement replays commands already applied
+        seen = {str(order_id) for order_id in Order.objects.filter(pk__in=placed_ids).values_list('id', flat=True)}
+
+        created = {}
+        touched = {}
+        cancelled = []
+        trades = []
+        credit_ids = set()
+
+        with transaction.atomic():
+            self._load_credits(commands)
+            for command in commands:
+                if command['type'] == 'place' and command['id'] not in seen:
+                    seen.add(command['id'])
+                    credit_ids.add(command['carbon_credit_id'])
+                    self._place(command, created, touched, trades)
+                elif command['type'] == 'cancel':
+                    credit_ids.add(command['carbon_credit_id'])
+                    self._cancel(command, created, cancelled)
+
+            now = timezone.now()
+            Order.objects.bulk_create(created.values())
+            Order.objects.bulk_update(
+                [
+                    Order(
+                        id=order.id,
+                        remaining=order.remaining,
+                        status='OPEN' if order.remaining else 'FILLED',
+                        updated_at=now
+                    )
+                    for order in touched.values()
+                ],
+                ['remaining', 'status', 'updated_at']
+            )
+            if cancelled:
+                Order.objects.filter(pk__in=cancelled).update(status='CANCELLED', updated_at=now)
+            if trades:
+                Transaction.objects.bulk_create(trades)
+                buyers = User.objects.in_bulk({trade.buyer_id for trade in trades})
+                for trade in trades:
+                    trade.buyer = buyers[trade.buyer_id]
+                OutboxService.publish_many(
+                    'chain.transfer',
+                    [OutboxService.transfer_payload(trade) for trade in trades]
+                )
+
+        self._publish_depth(credit_ids)
+
+    def _place(self, command: dict, created: dict, touched: dict, trades: list) -> None:
+        credit = self.credits.get(command['carbon_credit_id'])
+        self.sequence += 1
+        order = Order(
+            id=command['id'],
+            user_id=int(command['user_id']),
+            carbon_credit_id=command['carbon_credit_id'],
+            side=command['side'],
+            price=Decimal(command['price']),
+            quantity=Decimal(command['quantity']),
+            remaining=Decimal(command['quantity']),
+            sequence=self.sequence
+        )
+        created[order.id] = order
+
+        if credit is None or credit.status != 'VERIFIED' or credit.token_id is None:
+            order.status = 'REJECTED'
+            return
+        if order.side == 'SELL':
+            if order.user_id != credit.owner_id:
+                order.status = 'REJECTED'
+                return
+            # Sell orders escrow their inventory so fills can never oversell
+            try:
+                InventoryService.take(credit, order.quantity)
+            except InsufficientCreditsError:
+                order.status = 'REJECTED'
+                return
+
+        incoming = BookOrder(order.id, order.user_id, order.side, order.price, order.remaining, order.sequence)
+        book = self._book(order.carbon_credit_id)
+        for fill in book.submit(incoming):
+            resting = fill.sell if fill.buy is incoming else fill.buy
+            if resting.id in created:
+                created[resting.id].remaining = resting.remaining
+                created[resting.id].status = 'OPEN' if resting.remaining else 'FILLED'
+            else:
+                touched[resting.id] = resting
+            trades.append(Transaction(
+                buyer_id=fill.buy.user_id,
+                seller_id=fill.sell.user_id,
+                carbon_credit=credit,
+                quantity=fill.quantity,
+                price_per_credit=fill.price,
+                total_amount=fill.quantity * fill.price,
+                buy_order_id=fill.buy.id,
+                sell_order_id=fill.sell.id
+            ))
+        order.remaining = incoming.remaining
+        if incoming.remaining and incoming.id not in book.orders:
+            # Stopped at its owner's own resting order; the rest is cancelled, not crossed
+            order.status = 'CANCELLED'
+            if order.side == 'SELL':
+                InventoryService.give_back(credit.pk, incoming.remaining)
+        else:
+            order.status = 'OPEN' if incoming.remaining else 'FILLED'
+
+    def _cancel(self, command: dict, created: dict, cancelled: list) -> None:
+        book = self.books.get(command['carbon_credit_id'])
+        order = book.orders.get(command['id']) if book else None
+        if order is None or order.user_id != int(command['user_id']):
+            return
+        book.cancel(order.id)
+        if order.side == 'SELL':
+            InventoryService.give_back(command['carbon_credit_id'], order.remaining)
+        touched_order = created.get(order.id)
+        if touched_order is not None:
+            touched_order.status = 'CANCELLED'
+        else:
+            cancelled.append(order.id)
+
+    def _publish_depth(self, credit_ids: set) -> None:
+        pipeline = self.redis.pipeline(transaction=False)
+        for credit_id in credit_ids:
+            book = self.books.get(credit_id)
+            if book is not None:
+                pipeline.set(BOOK_KEY.format(credit_id), json.dumps(book.depth(settings.EXCHANGE_BOOK_DEPTH)))
+        pipeline.execute()
@@ -0,0 +1,103 @@
+from bisect import bisect_left, insort
+from collections import deque, namedtuple
+from decimal import Decimal
+
+Fill = namedtuple('Fill', ['buy', 'sell', 'price', 'quantity'])
+
+
+class BookOrder:
+    __slots__ = ('id', 'user_id', 'side', 'price', 'remaining', 'sequence')
+
+    def __init__(self, id, user_id, side: str, price: Decimal, remaining: Decimal, sequence: int):
+        self.id = id
+        self.user_id = user_id
+        self.side = side
+        self.price = price
+        self.remaining = remaining
+        self.sequence = sequence
+
+
+class OrderBook:
+    """Price-time priority limit order book for one credit, held entirely in memory
+
+    Each side keeps a sorted list of prices and a FIFO queue per price, so
+    matching touches only the best level and resting is a bisect insert.
+    """
+
+    def __init__(self):
+        self.prices = {'BUY': [], 'SELL': []}  # ascending; best bid is last, best ask first
+        self.levels = {'BUY': {}, 'SELL': {}}
+        self.orders = {}
+
+    def submit(self, order: BookOrder) -> list:
+        """Match an incoming order against the opposite side, then rest what is left
+
+        An order never trades with its owner's own resting order: matching
+        stops there and the rest of the incoming order is neither filled nor
+        rested (cancel newest), which the caller sees as it missing from orders.
+        """
+        fills = []
+        opposite = 'SELL' if order.side == 'BUY' else 'BUY'
+        prices = self.prices[opposite]
+        levels = self.levels[opposite]
+
+        while order.remaining and prices:
+            best = prices[0] if opposite == 'SELL' else prices[-1]
+            if (order.side == 'BUY' and best > order.price) or (order.side == 'SELL' and best < order.price):
+                break
+            level = levels[best]
+            while order.remaining and level:
+                resting = level[0]
+                if resting.user_id == order.user_id:
+                    return fills
+                quantity = min(order.remaining, resting.remaining)
+                order.remaining -= quantity
+                resting.remaining -= quantity
+                # Trades print at the resting order's price
+                if order.side == 'BUY':
+                    fills.append(Fill(order, resting, best, quantity))
+                else:
+                    fills.append(Fill(resting, order, best, quantity))
+                if not resting.remaining:
+                    level.popleft()
+                    del self.orders[resting.id]
+            if not level:
+                del levels[best]
+                prices.pop(0 if opposite == 'SELL' else -1)
+
+        if order.remaining:
+            self.rest(order)
+        return fills
+
+    def rest(self, order: BookOrder) -> None:
+        levels = self.levels[order.side]
+        level = levels.get(order.price)
+        if level is None:
+            level = levels[order.price] = deque()
+            insort(self.prices[order.side], order.price)
+        level.append(order)
+        self.orders[order.id] = order
+
+    def cancel(self, order_id) -> BookOrder:
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return None
+        level = self.levels[order.side][order.price]
+        level.remove(order)
+        if not level:
+            del self.levels[order.side][order.price]
+            prices = self.prices[order.side]
+            del prices[bisect_left(prices, order.price)]
+        return order
+
+    def depth(self, limit: int) -> dict:
+        """Aggregated quantity at the best price levels of each side"""
+        def side(name, prices):
+            return [
+                [str(price), str(sum(order.remaining for order in self.levels[name][price]))]
+                for price in prices[:limit]
+            ]
+        return {
+            'bids': side('BUY', self.prices['BUY'][::-1]),
+            'asks': side('SELL', self.prices['SELL']),
+        }
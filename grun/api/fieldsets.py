@@ -0,0 +1,73 @@
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def _names(value):
+    if value is None:
+        return None
+    return frozenset(name.strip() for name in value.split(',') if name.strip())
+
+
+def requested(query_params) -> tuple:
+    """(fields, expand) from ?fields=a,b&expand=c,c.d; None for a parameter the request left out"""
+    return _names(query_params.get(FIELDS_PARAM)), _names(query_params.get(EXPAND_PARAM))
+
+
+def is_expandable(field) -> bool:
+    # Nested serializers cost joins and method fields cost work per row
+    return isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField))
+
+
+def prune(serializer, fields=None, expand=None):
+    """Drop what the request did not ask for from a serializer instance
+
+    fields keeps only the named top-level fields. expand, when given, keeps
+    only the named nested serializers and method fields, and dotted names
+    (carbon_credit_details.owner_details) reach into nested ones. Without
+    expand everything is embedded as before.
+    """
+    available = serializer.fields
+    top_level = None if expand is None else {name.split('.', 1)[0] for name in expand}
+    unknown = ((fields or set()) | (top_level or set())) - set(available)
+    if unknown:
+        raise ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}"})
+
+    for name, field in list(available.items()):
+        if fields is not None and name not in fields:
+            del available[name]
+        elif top_level is not None and is_expandable(field) and name not in top_level:
+            del available[name]
+        elif expand is not None and isinstance(field, serializers.Serializer):
+            prune(field, None, frozenset(path.split('.', 1)[1] for path in expand if path.startswith(f'{name}.')))
+    return serializer
+
+
+def source_columns(serializer) -> list:
+    """Model columns behind the fields a pruned serializer still has, for .only()
+
+    Method fields name the columns they read in Meta.method_field_sources.
+    Nested serializers are left to the caller's select_related.
+    """
+    sources = getattr(serializer.Meta, 'method_field_sources', {})
+    columns = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SerializerMethodField):
+            columns += sources.get(name, ())
+        elif not isinstance(field, serializers.BaseSerializer) and field.source != '*':
+            columns.append('__'.join(field.source_attrs))
+    return columns
+
+
+class SparseFieldsMixin:
+    """Prunes the serializer to the request's ?fields= and ?expand= on reads"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None and request.method == 'GET':
+            prune(self, *requested(request.query_params))
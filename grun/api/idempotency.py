@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.serializers.json import DjangoJSONEncoder
+from django_redis import get_redis_connection
+from functools import wraps
+from redis.exceptions import LockError
+from rest_framework import status
+from rest_framework.response import Response
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+
+
+def _file_identity(value):
+    if isinstance(value, UploadedFile):
+        return [value.name, value.size]
+    return str(value)
+
+
+def _fingerprint(request) -> str:
+    """Hash of what was asked for, so a key cannot be reused for a different request"""
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    payload = json.dumps([request.method, request.path, data], sort_keys=True, default=_file_identity)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _replay(stored: bytes, fingerprint: str) -> Response:
+    stored = json.loads(stored)
+    if stored['fingerprint'] != fingerprint:
+        return Response(
+            {'error': 'Idempotency-Key was already used for a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(stored['data'], status=stored['status'], headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(view_method):
+    """Honour an Idempotency-Key header on a view method or function view
+
+    The first response per user and key is stored in Redis and replayed for
+    retries; a duplicate arriving while the first is still running waits on
+    a lock instead of repeating its side effects. Server errors and raised
+    exceptions are not stored, so those requests can be retried for real.
+    """
+    @wraps(view_method)
+    def wrapper(*args, **kwargs):
+        request = next(arg for arg in args if hasattr(arg, 'META'))
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        redis = get_redis_connection('default')
+        cache_key = f'idempotency:{request.user.pk}:{key}'
+        fingerprint = _fingerprint(request)
+
+        stored = redis.get(cache_key)
+        if stored is not None:
+            return _replay(stored, fingerprint)
+
+        lock = redis.lock(
+            f'{cache_key}:lock',
+            timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT,
+            blocking_timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT
+        )
+        if not lock.acquire():
+            return Response(
+                {'error': 'A request with this Idempotency-Key is still in progress'},
+                status=status.HTTP_409_CONFLICT
+            )
+        try:
+            # The request we waited for may have finished while we held off
+            stored = redis.get(cache_key)
+            if stored is not None:
+                return _replay(stored, fingerprint)
+
+            response = view_method(*args, **kwargs)
+            if response.status_code < 500:
+                redis.set(
+                    cache_key,
+                    json.dumps(
+                        {'fingerprint': fingerprint, 'status': response.status_code, 'data': response.data},
+                        cls=DjangoJSONEncoder
+                    ),
+                    ex=settings.IDEMPOTENCY_TTL
+                )
+            return response
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                logger.warning(f"Idempotency lock for {cache_key} expired before the request finished")
+
+    return wrapper
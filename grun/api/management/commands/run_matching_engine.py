@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from grun.api.exchange.engine import MatchingEngine
+import socket
+
+
+class Command(BaseCommand):
+    help = 'Run the limit-order matching engine (one process per command stream)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--consumer',
+            default=socket.gethostname(),
+            help='Stable consumer name, so unacknowledged commands are replayed after a restart'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Matching engine starting as {options['consumer']}")
+        MatchingEngine(options['consumer']).run()
@@ -0,0 +1,38 @@
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+import brotli
+
+accepts_brotli_re = _lazy_re_compile(r'\bbr\b')
+
+# Dynamic responses are compressed per request; higher qualities cost far more CPU for a few percent
+BROTLI_QUALITY = 5
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Brotli for clients that accept it, gzip for the rest
+
+    Streaming responses are left alone: compressing the listing event
+    stream would hold deltas back until a compressor block fills.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming:
+            return response
+        if not accepts_brotli_re.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return super().process_response(request, response)
+        if len(response.content) < 200 or response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(response.content))
+        # The body is no longer byte-for-byte what the strong ETag promised
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = 'br'
+        return response
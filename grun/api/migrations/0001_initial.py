@@ -0,0 +1,377 @@
+# Generated by Django 5.1.3 on 2026-10-17 07:33
+
+import django.contrib.auth.models
+import django.contrib.auth.validators
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+import django.utils.timezone
+import encrypted_model_fields.fields
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChainToken',
+            fields=[
+                ('token_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('project_name', models.CharField(max_length=255)),
+                ('verifier', models.CharField(max_length=255)),
+                ('issuance_date', models.DateTimeField()),
+                ('expiry_date', models.DateTimeField()),
+                ('total_credits', models.DecimalField(decimal_places=0, max_digits=78)),
+                ('owner_address', models.CharField(db_index=True, max_length=42)),
+                ('is_retired', models.BooleanField(default=False)),
+                ('metadata_uri', models.TextField(blank=True)),
+                ('minted_block', models.BigIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'chain_tokens',
+            },
+        ),
+        migrations.CreateModel(
+            name='IndexerCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('block_number', models.BigIntegerField()),
+                ('block_hash', models.CharField(blank=True, max_length=66)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'indexer_cursors',
+            },
+        ),
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('payment_type', models.CharField(choices=[('FIAT', 'Fiat Payment'), ('CRYPTO', 'Cryptocurrency Payment')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('fee_amount', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('stripe_payment_intent', models.CharField(blank=True, max_length=255, null=True)),
+                ('crypto_transaction_hash', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('username', models.CharField(error_messages={'unique': 'A user with that username already exists.'}, help_text='Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.', max_length=150, unique=True, validators=[django.contrib.auth.validators.UnicodeUsernameValidator()], verbose_name='username')),
+                ('first_name', models.CharField(blank=True, max_length=150, verbose_name='first name')),
+                ('last_name', models.CharField(blank=True, max_length=150, verbose_name='last name')),
+                ('email', models.EmailField(blank=True, max_length=254, verbose_name='email address')),
+                ('is_staff', models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status')),
+                ('is_active', models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active')),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
+                ('role', models.CharField(choices=[('BUYER', 'Buyer'), ('SELLER', 'Seller'), ('ADMIN', 'Admin')], max_length=10)),
+                ('wallet_address', encrypted_model_fields.fields.EncryptedCharField(blank=True, null=True)),
+                ('organization_name', models.CharField(blank=True, max_length=255)),
+                ('organization_type', models.CharField(blank=True, max_length=100)),
+                ('is_verified', models.BooleanField(default=False)),
+                ('is_blocked', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('groups', models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.group', verbose_name='groups')),
+                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.permission', verbose_name='user permissions')),
+            ],
+            options={
+                'db_table': 'users',
+            },
+            managers=[
+                ('objects', django.contrib.auth.models.UserManager()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CarbonCredit',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('project_name', models.CharField(max_length=255)),
+                ('verifier', models.CharField(max_length=255)),
+                ('issuance_date', models.DateField()),
+                ('expiry_date', models.DateField()),
+                ('total_credits', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('available_credits', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('token_id', models.CharField(max_length=255, null=True, unique=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending Verification'), ('VERIFIED', 'Verified'), ('REJECTED', 'Rejected'), ('RETIRED', 'Retired')], default='PENDING', max_length=20)),
+                ('price_per_credit', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('shard_count', models.PositiveSmallIntegerField(default=0)),
+                ('search_vector', models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('project_name', config='english', weight='A'), '||', django.contrib.postgres.search.SearchVector('verifier', config='english', weight='B'), django.contrib.postgres.search.SearchConfig('english')), output_field=django.contrib.postgres.search.SearchVectorField())),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'carbon_credits',
+            },
+        ),
+        migrations.CreateModel(
+            name='ChainBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token_id', models.BigIntegerField()),
+                ('address', models.CharField(db_index=True, max_length=42)),
+                ('balance', models.DecimalField(decimal_places=0, default=0, max_digits=78)),
+            ],
+            options={
+                'db_table': 'chain_balances',
+                'constraints': [models.UniqueConstraint(fields=('token_id', 'address'), name='unique_chain_balance')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ChainEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('block_number', models.BigIntegerField(db_index=True)),
+                ('block_hash', models.CharField(max_length=66)),
+                ('tx_hash', models.CharField(max_length=66)),
+                ('log_index', models.IntegerField()),
+                ('event', models.CharField(max_length=50)),
+                ('args', models.JSONField()),
+            ],
+            options={
+                'db_table': 'chain_events',
+                'constraints': [models.UniqueConstraint(fields=('tx_hash', 'log_index'), name='unique_chain_event')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ChainRetirement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token_id', models.BigIntegerField(db_index=True)),
+                ('address', models.CharField(db_index=True, max_length=42)),
+                ('amount', models.DecimalField(decimal_places=0, max_digits=78)),
+                ('tx_hash', models.CharField(max_length=66)),
+                ('log_index', models.IntegerField()),
+                ('block_number', models.BigIntegerField()),
+            ],
+            options={
+                'db_table': 'chain_retirements',
+                'ordering': ['-block_number', '-log_index'],
+                'constraints': [models.UniqueConstraint(fields=('tx_hash', 'log_index'), name='unique_chain_retirement')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CreditShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveSmallIntegerField()),
+                ('available', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('carbon_credit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shards', to='api.carboncredit')),
+            ],
+            options={
+                'db_table': 'credit_shards',
+            },
+        ),
+        migrations.CreateModel(
+            name='Document',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_type', models.CharField(max_length=100)),
+                ('file_size', models.IntegerField()),
+                ('file_url', encrypted_model_fields.fields.EncryptedCharField()),
+                ('upload_date', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending Review'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected')], default='PENDING', max_length=20)),
+                ('admin_comments', models.TextField(blank=True)),
+                ('review_date', models.DateTimeField(blank=True, null=True)),
+                ('virus_scanned', models.BooleanField(default=False)),
+                ('virus_scan_status', models.CharField(blank=True, max_length=50, null=True)),
+                ('carbon_credit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='documents', to='api.carboncredit')),
+                ('reviewed_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviewed_documents', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-upload_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('side', models.CharField(choices=[('BUY', 'Buy'), ('SELL', 'Sell')], max_length=4)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('remaining', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('status', models.CharField(choices=[('OPEN', 'Open'), ('FILLED', 'Filled'), ('CANCELLED', 'Cancelled'), ('REJECTED', 'Rejected')], default='OPEN', max_length=20)),
+                ('sequence', models.BigIntegerField(unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('carbon_credit', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='orders', to='api.carboncredit')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='orders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'orders',
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('topic', models.CharField(max_length=50)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('DISPATCHED', 'Dispatched'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('dispatched_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'outbox_events',
+                'indexes': [models.Index(condition=models.Q(('status', 'PENDING')), fields=['created_at'], name='outbox_pending_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Receipt',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('receipt_number', models.CharField(max_length=50, unique=True)),
+                ('pdf_url', models.URLField(null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('payment', models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, related_name='receipt', to='api.payment')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Transaction',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('price_per_credit', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('blockchain_tx_hash', models.CharField(max_length=255, null=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('COMPLETED', 'Completed'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('buy_order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='buy_fills', to='api.order')),
+                ('buyer', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='purchases', to=settings.AUTH_USER_MODEL)),
+                ('carbon_credit', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='api.carboncredit')),
+                ('sell_order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='sell_fills', to='api.order')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='sales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'transactions',
+            },
+        ),
+        migrations.CreateModel(
+            name='Reservation',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=20)),
+                ('status', models.CharField(choices=[('HELD', 'Held'), ('SETTLING', 'Settling'), ('SETTLED', 'Settled'), ('RELEASED', 'Released')], default='HELD', max_length=20)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('buyer', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='reservations', to=settings.AUTH_USER_MODEL)),
+                ('carbon_credit', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='reservations', to='api.carboncredit')),
+                ('transaction', models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, related_name='reservation', to='api.transaction')),
+            ],
+            options={
+                'db_table': 'reservations',
+            },
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='transaction',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, related_name='payment', to='api.transaction'),
+        ),
+        migrations.CreateModel(
+            name='ChainTransaction',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('action', models.CharField(choices=[('MINT', 'Mint'), ('TRANSFER', 'Transfer')], max_length=20)),
+                ('tx_hash', models.CharField(blank=True, db_index=True, max_length=66, null=True)),
+                ('status', models.CharField(choices=[('SUBMITTED', 'Submitted'), ('CONFIRMED', 'Confirmed'), ('FAILED', 'Failed')], default='SUBMITTED', max_length=20)),
+                ('raw_transaction', models.TextField(blank=True)),
+                ('nonce', models.BigIntegerField(blank=True, null=True)),
+                ('batch_index', models.PositiveIntegerField(blank=True, null=True)),
+                ('block_number', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('carbon_credit', models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='chain_transactions', to='api.carboncredit')),
+                ('document', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='chain_transactions', to='api.document')),
+                ('outbox_event', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='chain_transactions', to='api.outboxevent')),
+                ('transaction', models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='chain_transactions', to='api.transaction')),
+            ],
+            options={
+                'db_table': 'chain_transactions',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='carboncredit',
+            index=models.Index(fields=['-created_at', '-id'], name='credit_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carboncredit',
+            index=models.Index(condition=models.Q(('available_credits__gt', 0), ('status', 'VERIFIED')), fields=['-created_at', '-id'], name='credit_listing_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carboncredit',
+            index=models.Index(fields=['owner', '-created_at', '-id'], name='credit_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='carboncredit',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='credit_search_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='creditshard',
+            constraint=models.UniqueConstraint(fields=('carbon_credit', 'index'), name='unique_credit_shard'),
+        ),
+        migrations.AddConstraint(
+            model_name='creditshard',
+            constraint=models.CheckConstraint(condition=models.Q(('available__gte', 0)), name='credit_shard_available_gte_0'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['-upload_date', '-id'], name='document_uploaded_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['status', '-upload_date', '-id'], name='document_status_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'sequence'], name='order_status_sequence_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['-created_at', '-id'], name='transaction_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['buyer', '-created_at', '-id'], name='transaction_buyer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['seller', '-created_at', '-id'], name='transaction_seller_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('status', 'HELD')), fields=['expires_at'], name='reservation_held_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('stripe_payment_intent__isnull', False)), fields=['stripe_payment_intent'], name='payment_intent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chaintransaction',
+            index=models.Index(condition=models.Q(('status', 'SUBMITTED')), fields=['created_at'], name='chain_tx_submitted_idx'),
+        ),
+    ]
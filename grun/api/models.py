@@ -1,12 +1,14 @@
 from django.db import models
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.validators import MinValueValidator, FileExtensionValidator
+from django.utils import timezone
 from encrypted_model_fields.fields import EncryptedCharField
-from ...legaapi.storage import SecureS3Storage
+from .storage import SecureS3Storage
 import uuid
 from decimal import Decimal
-from legaapi.models import YourLegaModel
 
 class User(AbstractUser):
     ROLES = (
@@ -21,6 +23,7 @@ class User(AbstractUser):
     organization_type = models.CharField(max_length=100, blank=True)
     is_verified = models.BooleanField(default=False)
     is_blocked = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'users'
@@ -44,11 +47,46 @@ class CarbonCredit(models.Model):
     token_id = models.CharField(max_length=255, unique=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     price_per_credit = models.DecimalField(max_digits=10, decimal_places=2)
+    shard_count = models.PositiveSmallIntegerField(default=0)  # 0: inventory lives in available_credits
+    # Maintained by Postgres, so every write path keeps search in sync
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('project_name', weight='A', config='english')
+            + SearchVector('verifier', weight='B', config='english')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'carbon_credits'
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=['-created_at', '-id'], name='credit_created_id_idx'),
+            # Marketplace listings: only the small tradable slice of the table
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(status='VERIFIED', available_credits__gt=0),
+                name='credit_listing_idx'
+            ),
+            models.Index(fields=['owner', '-created_at', '-id'], name='credit_owner_created_idx'),
+            GinIndex(fields=['search_vector'], name='credit_search_idx'),
+        ]
+
+class CreditShard(models.Model):
+    """Slice of a hot credit's inventory so concurrent buyers lock different rows"""
+    carbon_credit = models.ForeignKey(CarbonCredit, on_delete=models.CASCADE, related_name='shards')
+    index = models.PositiveSmallIntegerField()
+    available = models.DecimalField(max_digits=20, decimal_places=2)
+
+    class Meta:
+        db_table = 'credit_shards'
+        constraints = [
+            models.UniqueConstraint(fields=['carbon_credit', 'index'], name='unique_credit_shard'),
+            models.CheckConstraint(check=models.Q(available__gte=0), name='credit_shard_available_gte_0'),
+        ]
 
 class Transaction(models.Model):
     STATUS_CHOICES = (
@@ -66,11 +104,201 @@ class Transaction(models.Model):
     total_amount = models.DecimalField(max_digits=20, decimal_places=2)
     blockchain_tx_hash = models.CharField(max_length=255, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    buy_order = models.ForeignKey('Order', on_delete=models.PROTECT, null=True, blank=True, related_name='buy_fills')
+    sell_order = models.ForeignKey('Order', on_delete=models.PROTECT, null=True, blank=True, related_name='sell_fills')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'transactions'
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=['-created_at', '-id'], name='transaction_created_id_idx'),
+            models.Index(fields=['buyer', '-created_at', '-id'], name='transaction_buyer_created_idx'),
+            models.Index(fields=['seller', '-created_at', '-id'], name='transaction_seller_created_idx'),
+        ]
+
+class Order(models.Model):
+    """Limit order; rows are written by the matching engine, which owns the live book"""
+    SIDES = (
+        ('BUY', 'Buy'),
+        ('SELL', 'Sell'),
+    )
+
+    STATUS_CHOICES = (
+        ('OPEN', 'Open'),
+        ('FILLED', 'Filled'),
+        ('CANCELLED', 'Cancelled'),
+        ('REJECTED', 'Rejected'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.PROTECT, related_name='orders')
+    carbon_credit = models.ForeignKey(CarbonCredit, on_delete=models.PROTECT, related_name='orders')
+    side = models.CharField(max_length=4, choices=SIDES)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.DecimalField(max_digits=20, decimal_places=2)
+    remaining = models.DecimalField(max_digits=20, decimal_places=2)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='OPEN')
+    sequence = models.BigIntegerField(unique=True)  # time priority, assigned by the engine
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'orders'
+        indexes = [
+            models.Index(fields=['status', 'sequence'], name='order_status_sequence_idx'),
+        ]
+
+class Reservation(models.Model):
+    STATUS_CHOICES = (
+        ('HELD', 'Held'),
+        ('SETTLING', 'Settling'),
+        ('SETTLED', 'Settled'),
+        ('RELEASED', 'Released'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    buyer = models.ForeignKey(User, related_name='reservations', on_delete=models.PROTECT)
+    carbon_credit = models.ForeignKey(CarbonCredit, related_name='reservations', on_delete=models.PROTECT)
+    transaction = models.OneToOneField(Transaction, related_name='reservation', on_delete=models.PROTECT)
+    quantity = models.DecimalField(max_digits=20, decimal_places=2)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='HELD')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'reservations'
+        indexes = [
+            # Expiry sweeper
+            models.Index(fields=['expires_at'], condition=models.Q(status='HELD'), name='reservation_held_expiry_idx'),
+        ]
+
+class OutboxEvent(models.Model):
+    """Side effect recorded in the same database transaction as the change that caused it"""
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('DISPATCHED', 'Dispatched'),
+        ('FAILED', 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    topic = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'outbox_events'
+        indexes = [
+            # Relay polling
+            models.Index(fields=['created_at'], condition=models.Q(status='PENDING'), name='outbox_pending_idx'),
+        ]
+
+class ChainTransaction(models.Model):
+    ACTIONS = (
+        ('MINT', 'Mint'),
+        ('TRANSFER', 'Transfer'),
+    )
+
+    STATUS_CHOICES = (
+        ('SUBMITTED', 'Submitted'),
+        ('CONFIRMED', 'Confirmed'),
+        ('FAILED', 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    action = models.CharField(max_length=20, choices=ACTIONS)
+    tx_hash = models.CharField(max_length=66, db_index=True, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='SUBMITTED')
+    raw_transaction = models.TextField(blank=True)  # signed bytes, rebroadcast as-is if lost
+    nonce = models.BigIntegerField(null=True, blank=True)
+    outbox_event = models.ForeignKey('OutboxEvent', on_delete=models.SET_NULL, null=True, related_name='chain_transactions')
+    batch_index = models.PositiveIntegerField(null=True, blank=True)  # position within a batch call
+    block_number = models.BigIntegerField(null=True, blank=True)
+    carbon_credit = models.ForeignKey(CarbonCredit, on_delete=models.PROTECT, null=True, related_name='chain_transactions')
+    transaction = models.ForeignKey(Transaction, on_delete=models.PROTECT, null=True, related_name='chain_transactions')
+    document = models.ForeignKey('Document', on_delete=models.SET_NULL, null=True, related_name='chain_transactions')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'chain_transactions'
+        indexes = [
+            # Confirmation polling
+            models.Index(fields=['created_at'], condition=models.Q(status='SUBMITTED'), name='chain_tx_submitted_idx'),
+        ]
+
+class IndexerCursor(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    block_number = models.BigIntegerField()
+    block_hash = models.CharField(max_length=66, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'indexer_cursors'
+
+class ChainEvent(models.Model):
+    """Journal of applied contract logs, replayed backwards on reorgs"""
+    block_number = models.BigIntegerField(db_index=True)
+    block_hash = models.CharField(max_length=66)
+    tx_hash = models.CharField(max_length=66)
+    log_index = models.IntegerField()
+    event = models.CharField(max_length=50)
+    args = models.JSONField()
+
+    class Meta:
+        db_table = 'chain_events'
+        constraints = [
+            models.UniqueConstraint(fields=['tx_hash', 'log_index'], name='unique_chain_event'),
+        ]
+
+class ChainToken(models.Model):
+    token_id = models.BigIntegerField(primary_key=True)
+    project_name = models.CharField(max_length=255)
+    verifier = models.CharField(max_length=255)
+    issuance_date = models.DateTimeField()
+    expiry_date = models.DateTimeField()
+    total_credits = models.DecimalField(max_digits=78, decimal_places=0)
+    owner_address = models.CharField(max_length=42, db_index=True)
+    is_retired = models.BooleanField(default=False)
+    metadata_uri = models.TextField(blank=True)
+    minted_block = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'chain_tokens'
+
+class ChainBalance(models.Model):
+    token_id = models.BigIntegerField()
+    address = models.CharField(max_length=42, db_index=True)
+    balance = models.DecimalField(max_digits=78, decimal_places=0, default=0)
+
+    class Meta:
+        db_table = 'chain_balances'
+        constraints = [
+            models.UniqueConstraint(fields=['token_id', 'address'], name='unique_chain_balance'),
+        ]
+
+class ChainRetirement(models.Model):
+    token_id = models.BigIntegerField(db_index=True)
+    address = models.CharField(max_length=42, db_index=True)
+    amount = models.DecimalField(max_digits=78, decimal_places=0)
+    tx_hash = models.CharField(max_length=66)
+    log_index = models.IntegerField()
+    block_number = models.BigIntegerField()
+
+    class Meta:
+        db_table = 'chain_retirements'
+        ordering = ['-block_number', '-log_index']
+        constraints = [
+            models.UniqueConstraint(fields=['tx_hash', 'log_index'], name='unique_chain_retirement'),
+        ]
 
 class Document(models.Model):
     STATUS_CHOICES = (
@@ -86,6 +314,7 @@ class Document(models.Model):
     file_size = models.IntegerField()  # in bytes
     file_url = EncryptedCharField(max_length=512)  # Encrypted S3 URL
     upload_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     admin_comments = models.TextField(blank=True)
     reviewed_by = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, related_name='reviewed_documents')
@@ -95,6 +324,11 @@ class Document(models.Model):
     
     class Meta:
         ordering = ['-upload_date']
+        indexes = [
+            # Keyset pagination order
+            models.Index(fields=['-upload_date', '-id'], name='document_uploaded_id_idx'),
+            models.Index(fields=['status', '-upload_date', '-id'], name='document_status_uploaded_idx'),
+        ]
 
     def __str__(self):
         return f"{self.file_name} - {self.status}"
@@ -129,6 +363,16 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Stripe webhook lookups
+            models.Index(
+                fields=['stripe_payment_intent'],
+                condition=models.Q(stripe_payment_intent__isnull=False),
+                name='payment_intent_idx'
+            ),
+        ]
+
     def calculate_fee(self):
         """Calculate platform fee (e.g., 2%)"""
         return self.amount * Decimal('0.02')
@@ -0,0 +1,152 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+import uuid
+
+
+def approximate_count(queryset) -> int:
+    """Row estimate from the planner, which costs the same however large the table is"""
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(BasePagination):
+    """Newest-first cursor pagination on (timestamp, id)
+
+    Each page is an index range scan that starts right after the previous
+    page's last row, so there is no OFFSET and no COUNT(*) and deep pages
+    cost the same as the first. Views whose creation timestamp is not
+    created_at set keyset_field. ?include_total=approx adds the planner's
+    row estimate.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    total_query_param = 'include_total'
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.field = getattr(view, 'keyset_field', 'created_at')
+        self.page_size = self.get_page_size(request)
+        reverse, position = self.decode_cursor(request)
+
+        if request.query_params.get(self.total_query_param) == 'approx':
+            self.total = approximate_count(queryset)
+        else:
+            self.total = None
+
+        if position is not None:
+            timestamp, pk = position
+            if reverse:
+                # Redundant lower bound keeps the filter usable as an index range
+                queryset = queryset.filter(
+                    Q(**{f'{self.field}__gt': timestamp}) | Q(**{self.field: timestamp, 'pk__gt': pk}),
+                    **{f'{self.field}__gte': timestamp}
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{self.field}__lt': timestamp}) | Q(**{self.field: timestamp, 'pk__lt': pk}),
+                    **{f'{self.field}__lte': timestamp}
+                )
+        ordering = (self.field, 'pk') if reverse else (f'-{self.field}', '-pk')
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_position = self.position(rows[-1]) if rows and (has_more or reverse) else None
+        if rows and position is not None and (has_more or not reverse):
+            self.previous_position = self.position(rows[0])
+        else:
+            self.previous_position = None
+        return rows
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def position(self, row) -> tuple:
+        if isinstance(row, dict):
+            # .values() rows from a ReadPlan list
+            return row[self.field], row['id']
+        return getattr(row, self.field), row.pk
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return False, None
+        try:
+            direction, timestamp, pk = urlsafe_b64decode(encoded.encode()).decode().split('|')
+            return direction == 'p', (datetime.fromisoformat(timestamp), uuid.UUID(pk))
+        except (TypeError, ValueError):
+            raise NotFound('Invalid cursor')
+
+    def encode_cursor(self, reverse: bool, position: tuple) -> str:
+        timestamp, pk = position
+        raw = f"{'p' if reverse else 'n'}|{timestamp.isoformat()}|{pk}"
+        return urlsafe_b64encode(raw.encode()).decode()
+
+    def link(self, request, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.link(self.request, self.encode_cursor(False, self.next_position))
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.link(self.request, self.encode_cursor(True, self.previous_position))
+
+    def get_page(self, data) -> dict:
+        """The page as cursors rather than links, so it can be cached and served on any host"""
+        page = {
+            'next_cursor': None if self.next_position is None else self.encode_cursor(False, self.next_position),
+            'previous_cursor': None if self.previous_position is None else self.encode_cursor(True, self.previous_position),
+            'results': data,
+        }
+        if self.total is not None:
+            page['approximate_total'] = self.total
+        return page
+
+    def page_body(self, request, page: dict) -> dict:
+        """Response body for a page from get_page, with links built for this request"""
+        body = {
+            'next': self.link(request, page['next_cursor']),
+            'previous': self.link(request, page['previous_cursor']),
+            'results': page['results'],
+        }
+        if 'approximate_total' in page:
+            body['approximate_total'] = page['approximate_total']
+        return body
+
+    def get_paginated_response(self, data):
+        return Response(self.page_body(self.request, self.get_page(data)))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'approximate_total': {'type': 'integer'},
+                'results': schema,
+            },
+        }
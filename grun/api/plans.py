@@ -0,0 +1,109 @@
+from django.core.exceptions import ImproperlyConfigured
+from functools import lru_cache
+from rest_framework import serializers
+from rest_framework.response import Response
+from .fieldsets import prune, requested
+from .pagination import KeysetPagination
+
+# Fields whose representation of a database value is the value itself
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+)
+
+# Fields a .values() row cannot feed
+UNSUPPORTED_FIELDS = (
+    serializers.SerializerMethodField,
+    serializers.ListSerializer,
+    serializers.ManyRelatedField,
+    serializers.HiddenField,
+    serializers.RelatedField,
+)
+
+
+class ReadPlan:
+    """A ModelSerializer's read shape compiled down to .values() columns
+
+    Built once per serializer class and ?fields= / ?expand= selection from
+    a pruned serializer, so unrequested fields cost neither columns nor
+    joins. represent() turns a .values() row into what serializer.data
+    holds for the same model instance, without creating model instances or
+    walking DRF's field machinery per row. Plain model fields, primary-key
+    relations and nested model serializers are supported; serializers with
+    anything else are refused when the plan is built.
+    """
+
+    def __init__(self, serializer, prefix: str = ''):
+        self.steps = []
+        self.columns = []
+        for key, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            column = prefix + '__'.join(field.source_attrs)
+            if isinstance(field, serializers.ModelSerializer):
+                nested = ReadPlan(field, f'{column}__')
+                # A null relation is null in its primary key column
+                pk_column = f'{column}__{field.Meta.model._meta.pk.name}'
+                self.steps.append((key, pk_column, None, nested))
+                self.columns += [pk_column, *nested.columns]
+            elif isinstance(field, serializers.PrimaryKeyRelatedField):
+                # .values() gives the related primary key itself
+                self.steps.append((key, column, None, None))
+                self.columns.append(column)
+            elif isinstance(field, UNSUPPORTED_FIELDS) or field.source == '*':
+                raise ImproperlyConfigured(
+                    f"{type(serializer).__name__}.{key} cannot be read from .values() rows"
+                )
+            else:
+                convert = None if isinstance(field, PASSTHROUGH_FIELDS) else field.to_representation
+                self.steps.append((key, column, convert, None))
+                self.columns.append(column)
+
+    @classmethod
+    @lru_cache(maxsize=256)
+    def for_serializer(cls, serializer_class, fields=None, expand=None) -> 'ReadPlan':
+        """Plan for serializer_class pruned to a ?fields= / ?expand= selection"""
+        return cls(prune(serializer_class(), fields, expand))
+
+    def represent(self, row: dict) -> dict:
+        data = {}
+        for key, column, convert, nested in self.steps:
+            value = row[column]
+            if value is None:
+                data[key] = None
+            elif nested is not None:
+                data[key] = nested.represent(row)
+            elif convert is None:
+                data[key] = value
+            else:
+                data[key] = convert(value)
+        return data
+
+    def represent_many(self, rows) -> list:
+        return [self.represent(row) for row in rows]
+
+
+class ReadPlanListMixin:
+    """list() through the serializer's ReadPlan: .values() rows straight to response data
+
+    Same JSON as the serializer, several times cheaper per row. Writes
+    still go through the serializer.
+    """
+
+    def list(self, request, *args, **kwargs):
+        plan, queryset = self.planned_queryset(request)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(plan.represent_many(page))
+        return Response(plan.represent_many(queryset))
+
+    def planned_queryset(self, request) -> tuple:
+        """The request's ReadPlan and the filtered .values() queryset it renders"""
+        plan = ReadPlan.for_serializer(self.get_serializer_class(), *requested(request.query_params))
+        columns = list(plan.columns)
+        if isinstance(self.paginator, KeysetPagination):
+            # The keyset paginator reads its cursor position from these
+            columns += ['id', getattr(self, 'keyset_field', 'created_at')]
+        return plan, self.filter_queryset(self.get_queryset()).values(*dict.fromkeys(columns))
@@ -0,0 +1,22 @@
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+import orjson
+
+
+class ORJSONRenderer(BaseRenderer):
+    """Compact JSON through orjson, in the same form as DRF's JSONRenderer
+
+    orjson writes str, int, float, bool, dict, list, UUID and datetime
+    natively; anything else (Decimal, lazy strings, querysets) falls back to
+    DRF's encoder, so the output matches what JSONRenderer would produce.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=self.encoder.default, option=self.options)
@@ -1,7 +1,16 @@
+from decimal import Decimal
+from django.conf import settings
 from rest_framework import serializers
-from .models import User, CarbonCredit, Transaction, Document
+from .fieldsets import SparseFieldsMixin
+from .models import User, CarbonCredit, Transaction, Document, ChainToken, ChainBalance, ChainRetirement, Reservation, Order
+from .services.search_service import SearchService
 
-class UserSerializer(serializers.ModelSerializer):
+def whole_credits(value):
+    # Credits become indivisible tokens on chain, so a fraction could never be minted or moved
+    if value % 1:
+        raise serializers.ValidationError("Credits are traded in whole units")
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'role', 'organization_name', 
@@ -12,15 +21,16 @@ class UserSerializer(serializers.ModelSerializer):
             'wallet_address': {'write_only': True}
         }
 
-class CarbonCreditSerializer(serializers.ModelSerializer):
+class CarbonCreditSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     owner_details = UserSerializer(source='owner', read_only=True)
     
     class Meta:
         model = CarbonCredit
-        fields = '__all__'
+        exclude = ('search_vector',)
         read_only_fields = ('token_id', 'status', 'available_credits')
+        extra_kwargs = {'total_credits': {'validators': [whole_credits]}}
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     buyer_details = UserSerializer(source='buyer', read_only=True)
     seller_details = UserSerializer(source='seller', read_only=True)
     carbon_credit_details = CarbonCreditSerializer(source='carbon_credit', read_only=True)
@@ -30,6 +40,87 @@ class TransactionSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('blockchain_tx_hash', 'status', 'total_amount')
 
+class PurchaseSerializer(serializers.Serializer):
+    carbon_credit = serializers.PrimaryKeyRelatedField(queryset=CarbonCredit.objects.all())
+    quantity = serializers.DecimalField(max_digits=20, decimal_places=2, min_value=Decimal(1), validators=[whole_credits])
+
+    def validate_carbon_credit(self, credit):
+        # A verified credit whose mint has not confirmed has nothing to transfer yet
+        if credit.token_id is None:
+            raise serializers.ValidationError("Credit has no token on chain yet")
+        return credit
+
+class BulkPurchaseLineSerializer(serializers.Serializer):
+    carbon_credit = serializers.UUIDField()
+    quantity = serializers.DecimalField(max_digits=20, decimal_places=2, min_value=Decimal(1), validators=[whole_credits])
+
+class BulkPurchaseSerializer(serializers.Serializer):
+    lines = BulkPurchaseLineSerializer(many=True, allow_empty=False)
+    all_or_nothing = serializers.BooleanField(default=False)
+
+    def validate_lines(self, lines):
+        if len(lines) > settings.BULK_PURCHASE_MAX_LINES:
+            raise serializers.ValidationError(f"At most {settings.BULK_PURCHASE_MAX_LINES} lines per request")
+        # One query for every credit in the basket instead of one per line
+        credits = CarbonCredit.objects.in_bulk({line['carbon_credit'] for line in lines})
+        missing = [str(line['carbon_credit']) for line in lines if line['carbon_credit'] not in credits]
+        if missing:
+            raise serializers.ValidationError(f"Unknown credits: {', '.join(missing)}")
+        return [
+            {'carbon_credit': credits[line['carbon_credit']], 'quantity': line['quantity']}
+            for line in lines
+        ]
+
+class ListingSearchSerializer(serializers.Serializer):
+    q = serializers.CharField(required=False, allow_blank=True, max_length=200)
+    verifier = serializers.CharField(required=False, max_length=255)
+    status = serializers.ChoiceField(choices=('VERIFIED', 'RETIRED'), required=False)
+    min_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    max_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    vintage_from = serializers.DateField(required=False)
+    vintage_to = serializers.DateField(required=False)
+    expires_after = serializers.DateField(required=False)
+    expires_before = serializers.DateField(required=False)
+    page_size = serializers.IntegerField(required=False, min_value=1, max_value=100, default=20)
+    cursor = serializers.CharField(required=False)
+
+    def validate_cursor(self, value):
+        try:
+            return SearchService.decode_cursor(value)
+        except (TypeError, ValueError):
+            raise serializers.ValidationError("Invalid cursor")
+
+    def validate(self, data):
+        # Ranked and unranked results are ordered differently, so their cursors do not mix
+        if 'cursor' in data and (data['cursor'][0] is None) == bool(data.get('q')):
+            raise serializers.ValidationError({'cursor': "Cursor does not belong to this search"})
+        return data
+
+class OrderSerializer(serializers.ModelSerializer):
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    quantity = serializers.DecimalField(max_digits=20, decimal_places=2, min_value=Decimal(1), validators=[whole_credits])
+
+    class Meta:
+        model = Order
+        fields = ('id', 'carbon_credit', 'side', 'price', 'quantity', 'remaining', 'status', 'created_at')
+        read_only_fields = ('id', 'remaining', 'status', 'created_at')
+
+    def validate(self, data):
+        credit = data['carbon_credit']
+        if credit.status != 'VERIFIED' or credit.token_id is None:
+            raise serializers.ValidationError("Credit is not tradable")
+        if data['side'] == 'SELL' and credit.owner_id != self.context['request'].user.id:
+            raise serializers.ValidationError("Only the credit owner can sell it")
+        return data
+
+class ReservationSerializer(serializers.ModelSerializer):
+    reservation_id = serializers.UUIDField(source='id', read_only=True)
+
+    class Meta:
+        model = Reservation
+        fields = ('reservation_id', 'transaction', 'carbon_credit', 'quantity', 'status', 'expires_at')
+        read_only_fields = fields
+
 class DocumentUploadSerializer(serializers.ModelSerializer):
     file = serializers.FileField(write_only=True)
     
@@ -49,13 +140,41 @@ class DocumentUploadSerializer(serializers.ModelSerializer):
         
         return value
 
-class DocumentSerializer(serializers.ModelSerializer):
+class DocumentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     download_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Document
         fields = '__all__'
         read_only_fields = ('file_url', 'virus_scanned', 'virus_scan_status')
+        # Columns each method field reads, so pruned querysets still load them
+        method_field_sources = {'download_url': ('file_url',)}
         
     def get_download_url(self, obj):
-        return obj.get_download_url() 
\ No newline at end of file
+        return obj.get_download_url() 
+
+class ChainBalanceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChainBalance
+        fields = ('address', 'balance')
+
+class ChainRetirementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChainRetirement
+        fields = ('address', 'amount', 'tx_hash', 'block_number')
+
+class ChainTokenSerializer(serializers.ModelSerializer):
+    balances = serializers.SerializerMethodField()
+    retirements = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ChainToken
+        fields = '__all__'
+
+    def get_balances(self, obj):
+        balances = ChainBalance.objects.filter(token_id=obj.token_id, balance__gt=0)
+        return ChainBalanceSerializer(balances, many=True).data
+
+    def get_retirements(self, obj):
+        retirements = ChainRetirement.objects.filter(token_id=obj.token_id)
+        return ChainRetirementSerializer(retirements, many=True).data
@@ -0,0 +1,240 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+from ..models import ChainTransaction, Reservation
+from ..blockchain.read_cache import invalidate_token
+from ..blockchain.web3_handler import get_web3_handler, to_int
+from .inventory_service import InventoryService
+import logging
+
+logger = logging.getLogger(__name__)
+
+LAST_POLLED_BLOCK_KEY = 'chain_confirmations:last_block'
+
+
+class ConfirmationService:
+    @staticmethod
+    def poll() -> int:
+        """Settle every submitted transaction that reached the confirmation depth"""
+        web3_handler = get_web3_handler()
+        head = web3_handler.block_number()
+        if cache.get(LAST_POLLED_BLOCK_KEY) == head:
+            # Nothing can have changed since the last run
+            return 0
+
+        pending = list(
+            ChainTransaction.objects
+            .filter(status='SUBMITTED')
+            .select_related('carbon_credit__owner', 'transaction__carbon_credit', 'document')
+            .order_by('created_at')[:settings.WEB3_CONFIRMATION_BATCH_SIZE]
+        )
+        tx_hashes = list(dict.fromkeys(chain_tx.tx_hash for chain_tx in pending))
+        receipts = dict(zip(tx_hashes, web3_handler.get_receipts(tx_hashes)))
+
+        ConfirmationService._rebroadcast(
+            [chain_tx for chain_tx in pending if receipts.get(chain_tx.tx_hash) is None],
+            head
+        )
+
+        settled = sum(
+            ConfirmationService._settle(chain_tx, receipts[chain_tx.tx_hash], head)
+            for chain_tx in pending
+            if receipts.get(chain_tx.tx_hash) is not None
+        )
+
+        cache.set(LAST_POLLED_BLOCK_KEY, head, None)
+        return settled
+
+    @staticmethod
+    def _settle(chain_tx: ChainTransaction, receipt: dict, head: int) -> bool:
+        """Confirm or fail a mined transaction once it is deep enough"""
+        block_number = to_int(receipt['blockNumber'])
+        if head - block_number + 1 < settings.WEB3_CONFIRMATION_BLOCKS:
+            return False
+        try:
+            with transaction.atomic():
+                chain_tx.block_number = block_number
+                if to_int(receipt['status']) == 1:
+                    ConfirmationService._confirm(chain_tx, receipt)
+                else:
+                    ConfirmationService.fail(chain_tx, 'Transaction reverted')
+            return True
+        except Exception as e:
+            logger.error(f"Error settling {chain_tx.tx_hash}: {str(e)}")
+            return False
+
+    @staticmethod
+    def _rebroadcast(unmined: list, head: int) -> None:
+        """Resend signed transactions the node seems to have lost"""
+        cutoff = timezone.now() - timedelta(seconds=settings.WEB3_REBROADCAST_AFTER)
+        stale = {}
+        for chain_tx in unmined:
+            if chain_tx.raw_transaction and chain_tx.updated_at <= cutoff:
+                stale.setdefault(chain_tx.tx_hash, []).append(chain_tx)
+
+        web3_handler = get_web3_handler()
+        nonce_too_low = False
+        for tx_hash, batch in stale.items():
+            try:
+                web3_handler.broadcast(batch[0].raw_transaction)
+            except Exception as e:
+                if 'nonce too low' not in str(e).lower():
+                    logger.warning(f"Rebroadcast of {tx_hash} failed: {str(e)}")
+                    continue
+                nonce_too_low = True
+                ConfirmationService._recheck(batch, head)
+                continue
+            ChainTransaction.objects.filter(tx_hash=tx_hash).update(updated_at=timezone.now())
+
+        if nonce_too_low:
+            # The chain is past nonces we signed, so the counter may be behind it too
+            try:
+                web3_handler.nonce_manager.resync()
+            except Exception as e:
+                logger.warning(f"Nonce resync failed: {str(e)}")
+
+    @staticmethod
+    def _recheck(batch: list, head: int) -> None:
+        """Settle a 'nonce too low' rebroadcast from what the write node knows
+
+        The error also comes back when our own transaction was mined after
+        the receipt poll, or when the poll read a lagging replica, so the
+        rows only fail when the hash is unknown and the nonce is spent.
+        """
+        web3_handler = get_web3_handler()
+        tx_hash = batch[0].tx_hash
+        try:
+            receipt, pending = web3_handler.lookup_transaction(tx_hash)
+            if receipt is not None:
+                for chain_tx in batch:
+                    ConfirmationService._settle(chain_tx, receipt, head)
+                return
+            if pending is not None or batch[0].nonce is None:
+                return
+            replaced = web3_handler.confirmed_nonce() > batch[0].nonce
+        except Exception as e:
+            logger.warning(f"Could not recheck {tx_hash}: {str(e)}")
+            return
+
+        if replaced:
+            # Another transaction took the nonce, so this one can never be mined
+            with transaction.atomic():
+                for chain_tx in batch:
+                    ConfirmationService.fail(chain_tx, 'Replaced by another transaction')
+
+    @staticmethod
+    def fill_nonce_gap():
+        """Spend a nonce the node is stuck on that no recorded transaction holds
+
+        A nonce can be lost between allocation and the commit that records
+        it (a crashed relay, a release that never ran). Everything signed
+        after it then waits in the mempool forever. Only a gap that has
+        outlived the rebroadcast window is filled, so a relay that is still
+        committing its nonce is never raced. Returns the filled nonce.
+        """
+        web3_handler = get_web3_handler()
+        nonce_manager = web3_handler.nonce_manager
+        pending = web3_handler.pending_nonce()
+        counter = nonce_manager.peek()
+        if counter is None or counter <= pending:
+            if counter is not None and counter < pending:
+                # Something else sent from the account; never hand out a spent nonce
+                nonce_manager.resync()
+            return None
+
+        submitted = ChainTransaction.objects.filter(status='SUBMITTED', nonce__gte=pending)
+        if submitted.filter(nonce=pending).exists():
+            # The node is waiting on one of ours, which the rebroadcast resends
+            return None
+        cutoff = timezone.now() - timedelta(seconds=settings.WEB3_REBROADCAST_AFTER)
+        if not submitted.filter(created_at__lte=cutoff).exists():
+            return None
+
+        tx_hash = web3_handler.send_noop(pending)
+        logger.warning(f"Filled nonce gap at {pending} with {tx_hash}")
+        # Drops the filled nonce from the free set if it was parked there
+        nonce_manager.resync()
+        return pending
+
+    @staticmethod
+    def _confirm(chain_tx: ChainTransaction, receipt: dict) -> None:
+        chain_tx.status = 'CONFIRMED'
+        chain_tx.save()
+
+        if chain_tx.action == 'MINT':
+            token_ids = get_web3_handler().minted_token_ids(receipt)
+            token_id = token_ids[chain_tx.batch_index or 0]
+            credit = chain_tx.carbon_credit
+            credit.token_id = token_id
+            if chain_tx.document:
+                credit.status = 'VERIFIED'
+            credit.save()
+
+            if chain_tx.document:
+                chain_tx.document.status = 'APPROVED'
+                chain_tx.document.save()
+                transaction.on_commit(
+                    lambda: ConfirmationService._notify_minted(credit, token_id, chain_tx.tx_hash)
+                )
+
+        elif chain_tx.action == 'TRANSFER':
+            chain_tx.transaction.status = 'COMPLETED'
+            chain_tx.transaction.blockchain_tx_hash = chain_tx.tx_hash
+            chain_tx.transaction.save()
+            Reservation.objects.filter(transaction=chain_tx.transaction).update(status='SETTLED')
+            # Balances cached in any process for this token predate the transfer
+            invalidate_token(int(chain_tx.transaction.carbon_credit.token_id))
+
+    @staticmethod
+    def fail(chain_tx: ChainTransaction, reason: str) -> None:
+        chain_tx.status = 'FAILED'
+        chain_tx.save()
+        logger.error(f"{chain_tx.action} {chain_tx.tx_hash} failed: {reason}")
+
+        if chain_tx.action == 'MINT' and chain_tx.document:
+            chain_tx.document.status = 'REJECTED'
+            chain_tx.document.admin_comments = f"Token creation failed: {reason}"
+            chain_tx.document.save()
+            credit = chain_tx.carbon_credit
+            transaction.on_commit(
+                lambda: ConfirmationService._notify_mint_failed(credit, reason)
+            )
+
+        elif chain_tx.action == 'TRANSFER':
+            purchase = chain_tx.transaction
+            purchase.status = 'FAILED'
+            purchase.save()
+            # Credits were taken off the market when the transfer was sent
+            InventoryService.give_back(purchase.carbon_credit_id, purchase.quantity)
+            Reservation.objects.filter(transaction=purchase).update(status='RELEASED')
+
+    @staticmethod
+    def _notify_minted(credit, token_id, tx_hash) -> None:
+        send_mail(
+            'Carbon Credit Token Created',
+            f'''Your carbon credit has been verified and tokenized.
+            Token ID: {token_id}
+            Transaction Hash: {tx_hash}
+            Project: {credit.project_name}
+            Credits: {credit.total_credits}
+            ''',
+            settings.DEFAULT_FROM_EMAIL,
+            [credit.owner.email],
+            fail_silently=False,
+        )
+
+    @staticmethod
+    def _notify_mint_failed(credit, reason) -> None:
+        send_mail(
+            'Carbon Credit Verification Failed',
+            f'''There was an error verifying your carbon credit.
+            Project: {credit.project_name}
+            Error: {reason}
+            ''',
+            settings.DEFAULT_FROM_EMAIL,
+            [credit.owner.email],
+            fail_silently=False,
+        )
@@ -0,0 +1,148 @@
+from decimal import Decimal, ROUND_DOWN
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from ..caching import listings_changed
+from ..exceptions import InsufficientCreditsError
+from ..models import CarbonCredit, CreditShard
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+
+
+def split(total: Decimal, count: int) -> list:
+    """Divide total into count cent-precise parts that add back up exactly"""
+    part = (total / count).quantize(Decimal('0.01'), rounding=ROUND_DOWN)
+    return [total - part * (count - 1)] + [part] * (count - 1)
+
+
+class InventoryService:
+    """Available credits for a listing, optionally spread over shard rows
+
+    Inventory only leaves through conditional decrements that cannot take a
+    row below zero, so sharded or not the credits sold never exceed what was
+    listed. For sharded credits available_credits is a folded total for
+    display and filtering; the shard rows are authoritative.
+    """
+
+    @staticmethod
+    def take(credit: CarbonCredit, quantity: Decimal) -> None:
+        """Remove quantity from the listing; call inside the purchase transaction"""
+        if InventoryService._take(credit.pk, credit.shard_count, quantity):
+            return
+        # The credit may have been sharded or unsharded since it was loaded
+        shard_count = CarbonCredit.objects.values_list('shard_count', flat=True).get(pk=credit.pk)
+        if shard_count == credit.shard_count or not InventoryService._take(credit.pk, shard_count, quantity):
+            raise InsufficientCreditsError()
+
+    @staticmethod
+    def _take(credit_id, shard_count: int, quantity: Decimal) -> bool:
+        if not shard_count:
+            taken = CarbonCredit.objects.filter(
+                pk=credit_id,
+                status='VERIFIED',
+                shard_count=0,
+                available_credits__gte=quantity
+            ).update(available_credits=F('available_credits') - quantity, updated_at=timezone.now())
+            if taken:
+                listings_changed(credit_id)
+            return bool(taken)
+
+        if not CarbonCredit.objects.filter(pk=credit_id, status='VERIFIED').exists():
+            return False
+        # No join in the UPDATE: Postgres would turn it into WHERE id IN (SELECT ...)
+        # and stop rechecking available >= quantity against concurrent takes
+        shards = CreditShard.objects.filter(carbon_credit_id=credit_id)
+        # Start at a random shard so concurrent buyers spread over different rows
+        start = random.randrange(shard_count)
+        for offset in range(shard_count):
+            index = (start + offset) % shard_count
+            if shards.filter(index=index, available__gte=quantity).update(available=F('available') - quantity):
+                return True
+
+        # No single shard is deep enough; drain several under their row locks
+        locked = list(shards.select_for_update().order_by('index'))
+        if sum(shard.available for shard in locked) < quantity:
+            return False
+        remaining = quantity
+        for shard in locked:
+            part = min(shard.available, remaining)
+            shard.available -= part
+            remaining -= part
+        CreditShard.objects.bulk_update(locked, ['available'])
+        return True
+
+    @staticmethod
+    def give_back(credit_id, quantity: Decimal) -> None:
+        """Return released or failed purchase quantity to the listing"""
+        while True:
+            shard_count = CarbonCredit.objects.values_list('shard_count', flat=True).get(pk=credit_id)
+            if shard_count:
+                updated = CreditShard.objects.filter(
+                    carbon_credit_id=credit_id,
+                    index=random.randrange(shard_count)
+                ).update(available=F('available') + quantity)
+            else:
+                updated = CarbonCredit.objects.filter(pk=credit_id, shard_count=0).update(
+                    available_credits=F('available_credits') + quantity,
+                    updated_at=timezone.now()
+                )
+                if updated:
+                    listings_changed(credit_id)
+            if updated:
+                return
+
+    @staticmethod
+    def shard(credit: CarbonCredit, count: int) -> CarbonCredit:
+        """Spread a credit's inventory over count shard rows; 0 folds it back into the credit row"""
+        with transaction.atomic():
+            credit = CarbonCredit.objects.select_for_update().get(pk=credit.pk)
+            available = credit.available_credits
+            if credit.shard_count:
+                shards = list(CreditShard.objects.select_for_update().filter(carbon_credit=credit))
+                available = sum(shard.available for shard in shards)
+                CreditShard.objects.filter(carbon_credit=credit).delete()
+            if count:
+                CreditShard.objects.bulk_create([
+                    CreditShard(carbon_credit=credit, index=index, available=part)
+                    for index, part in enumerate(split(available, count))
+                ])
+            credit.available_credits = available
+            credit.shard_count = count
+            credit.save(update_fields=['available_credits', 'shard_count', 'updated_at'])
+        logger.info(f"Credit {credit.id} inventory now in {count} shards")
+        return credit
+
+    @staticmethod
+    def fold(credit_id) -> Decimal:
+        """Write the shard total back to available_credits and even out drained shards"""
+        with transaction.atomic():
+            shards = list(
+                CreditShard.objects
+                .select_for_update()
+                .filter(carbon_credit_id=credit_id)
+                .order_by('index')
+            )
+            if not shards:
+                return None
+            available = sum(shard.available for shard in shards)
+            for shard, part in zip(shards, split(available, len(shards))):
+                shard.available = part
+            CreditShard.objects.bulk_update(shards, ['available'])
+            changed = CarbonCredit.objects.filter(pk=credit_id).exclude(available_credits=available).update(
+                available_credits=available,
+                updated_at=timezone.now()
+            )
+            if changed:
+                listings_changed(credit_id)
+        return available
+
+    @staticmethod
+    def fold_all() -> int:
+        credit_ids = list(
+            CarbonCredit.objects.filter(shard_count__gt=0).values_list('id', flat=True)
+        )
+        for credit_id in credit_ids:
+            InventoryService.fold(credit_id)
+        return len(credit_ids)
@@ -0,0 +1,49 @@
+from decimal import Decimal
+from django.conf import settings
+from django_redis import get_redis_connection
+from ..models import CarbonCredit, Order, User
+from ..exchange.engine import BOOK_KEY, COMMAND_STREAM
+import json
+import uuid
+
+
+class OrderService:
+    """Hands order commands to the matching engine; the API never touches the book itself"""
+
+    @staticmethod
+    def _send(command: dict) -> None:
+        get_redis_connection('default').xadd(
+            COMMAND_STREAM,
+            command,
+            maxlen=settings.EXCHANGE_STREAM_MAXLEN,
+            approximate=True
+        )
+
+    @staticmethod
+    def place(user: User, credit: CarbonCredit, side: str, price: Decimal, quantity: Decimal) -> str:
+        order_id = str(uuid.uuid4())
+        OrderService._send({
+            'type': 'place',
+            'id': order_id,
+            'user_id': str(user.pk),
+            'carbon_credit_id': str(credit.pk),
+            'side': side,
+            'price': str(price),
+            'quantity': str(quantity),
+        })
+        return order_id
+
+    @staticmethod
+    def cancel(order: Order) -> None:
+        OrderService._send({
+            'type': 'cancel',
+            'id': str(order.id),
+            'user_id': str(order.user_id),
+            'carbon_credit_id': str(order.carbon_credit_id),
+        })
+
+    @staticmethod
+    def depth(credit_id) -> dict:
+        """Best levels of the book as last published by the engine"""
+        depth = get_redis_connection('default').get(BOOK_KEY.format(credit_id))
+        return json.loads(depth) if depth else {'bids': [], 'asks': []}
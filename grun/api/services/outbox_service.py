@@ -0,0 +1,202 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from ..models import CarbonCredit, ChainTransaction, Document, OutboxEvent, Transaction
+from ..blockchain.web3_handler import get_web3_handler
+from .confirmation_service import ConfirmationService
+import logging
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = {
+    'chain.mint': 'MINT',
+    'chain.transfer': 'TRANSFER',
+}
+
+
+def token_amount(amount: str) -> int:
+    """Token units for a credit quantity; tokens are indivisible, so a fraction is refused rather than rounded"""
+    value = Decimal(amount)
+    if value % 1:
+        raise ValueError(f"Fractional quantity {amount} cannot go on chain")
+    return int(value)
+
+
+class OutboxService:
+    """Chain side effects written with the domain change and relayed to the node afterwards"""
+
+    @staticmethod
+    def publish(topic: str, payload: dict) -> OutboxEvent:
+        """Record a side effect; must run inside the caller's transaction"""
+        return OutboxEvent.objects.create(topic=topic, payload=payload)
+
+    @staticmethod
+    def publish_mint(credit: CarbonCredit, document: Document = None,
+                     metadata_uri: str = '') -> OutboxEvent:
+        expiry = datetime.combine(credit.expiry_date, time.min, tzinfo=dt_timezone.utc)
+        return OutboxService.publish('chain.mint', {
+            'carbon_credit_id': str(credit.id),
+            'document_id': str(document.id) if document else None,
+            'project_name': credit.project_name,
+            'verifier': credit.verifier,
+            'expiry_timestamp': int(expiry.timestamp()),
+            'amount': str(credit.total_credits),
+            'metadata_uri': metadata_uri,
+        })
+
+    @staticmethod
+    def publish_many(topic: str, payloads: list) -> list:
+        return OutboxEvent.objects.bulk_create([
+            OutboxEvent(topic=topic, payload=payload) for payload in payloads
+        ])
+
+    @staticmethod
+    def transfer_payload(purchase: Transaction) -> dict:
+        credit = purchase.carbon_credit
+        return {
+            'transaction_id': str(purchase.id),
+            'carbon_credit_id': str(credit.id),
+            'token_id': int(credit.token_id),
+            'from_address': credit.owner.wallet_address,
+            'to_address': purchase.buyer.wallet_address,
+            'amount': str(purchase.quantity),
+        }
+
+    @staticmethod
+    def publish_transfer(purchase: Transaction) -> OutboxEvent:
+        return OutboxService.publish('chain.transfer', OutboxService.transfer_payload(purchase))
+
+    @staticmethod
+    def relay() -> int:
+        """Sign and record the oldest pending events, then broadcast once that is committed
+
+        The signed bytes are stored before anything reaches the node, so a lost
+        broadcast is retried with the same transaction and can never double-spend.
+        """
+        web3_handler = get_web3_handler()
+        nonces = []
+        try:
+            with transaction.atomic():
+                events = list(
+                    OutboxEvent.objects
+                    .select_for_update(skip_locked=True)
+                    .filter(status='PENDING', available_at__lte=timezone.now())
+                    .order_by('created_at')[:settings.WEB3_BATCH_MAX_SIZE]
+                )
+
+                mints = [event for event in events if event.topic == 'chain.mint']
+                transfers = {}
+                for event in events:
+                    if event.topic == 'chain.transfer':
+                        # safeBatchTransferFrom moves tokens between a single pair of addresses
+                        pair = (event.payload['from_address'], event.payload['to_address'])
+                        transfers.setdefault(pair, []).append(event)
+
+                signed = []
+                if mints:
+                    signed += OutboxService._dispatch(mints, OutboxService._mint_call, nonces)
+                for batch in transfers.values():
+                    signed += OutboxService._dispatch(batch, OutboxService._transfer_call, nonces)
+
+                transaction.on_commit(lambda: OutboxService._broadcast(signed))
+        except Exception:
+            # Nothing signed here will be sent; hand exactly those nonces back.
+            # Other relays may hold later nonces, so the counter is never reset.
+            for nonce in reversed(nonces):
+                web3_handler.nonce_manager.release(nonce)
+            raise
+
+        return len(events)
+
+    @staticmethod
+    def _dispatch(batch: list, build_call, nonces: list) -> list:
+        web3_handler = get_web3_handler()
+        try:
+            tx_hash, raw_transaction, nonce = web3_handler.sign_transaction(build_call(web3_handler, batch))
+        except Exception as e:
+            logger.error(f"Signing {len(batch)} {batch[0].topic} events failed: {str(e)}")
+            OutboxService._retry_later(batch, str(e))
+            return []
+        nonces.append(nonce)
+
+        chain_txs = [
+            OutboxService._chain_transaction(
+                event,
+                status='SUBMITTED',
+                tx_hash=tx_hash,
+                raw_transaction=raw_transaction,
+                nonce=nonce,
+                batch_index=index
+            )
+            for index, event in enumerate(batch)
+        ]
+        ChainTransaction.objects.bulk_create(chain_txs)
+
+        now = timezone.now()
+        for event in batch:
+            event.status = 'DISPATCHED'
+            event.attempts += 1
+            event.dispatched_at = now
+        OutboxEvent.objects.bulk_update(batch, ['status', 'attempts', 'dispatched_at'])
+
+        if batch[0].topic == 'chain.transfer':
+            Transaction.objects.filter(
+                pk__in=[event.payload['transaction_id'] for event in batch]
+            ).update(blockchain_tx_hash=tx_hash)
+        return [raw_transaction]
+
+    @staticmethod
+    def _retry_later(batch: list, reason: str) -> None:
+        now = timezone.now()
+        for event in batch:
+            event.attempts += 1
+            event.last_error = reason
+            if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                event.status = 'FAILED'
+                ConfirmationService.fail(
+                    OutboxService._chain_transaction(event, status='FAILED'),
+                    reason
+                )
+            else:
+                event.available_at = now + timedelta(seconds=min(2 ** event.attempts, 300))
+        OutboxEvent.objects.bulk_update(batch, ['status', 'attempts', 'last_error', 'available_at'])
+
+    @staticmethod
+    def _broadcast(raw_transactions: list) -> None:
+        web3_handler = get_web3_handler()
+        for raw_transaction in raw_transactions:
+            try:
+                web3_handler.broadcast(raw_transaction)
+            except Exception as e:
+                # Recorded as SUBMITTED; the confirmation poller rebroadcasts it
+                logger.warning(f"Broadcast failed, will retry: {str(e)}")
+
+    @staticmethod
+    def _chain_transaction(event: OutboxEvent, **fields) -> ChainTransaction:
+        return ChainTransaction(
+            action=ACTIONS[event.topic],
+            outbox_event=event,
+            carbon_credit_id=event.payload.get('carbon_credit_id'),
+            document_id=event.payload.get('document_id'),
+            transaction_id=event.payload.get('transaction_id'),
+            **fields
+        )
+
+    @staticmethod
+    def _mint_call(web3_handler, batch: list):
+        return web3_handler.mint_batch_call([
+            {**event.payload, 'amount': token_amount(event.payload['amount'])}
+            for event in batch
+        ])
+
+    @staticmethod
+    def _transfer_call(web3_handler, batch: list):
+        payload = batch[0].payload
+        return web3_handler.transfer_batch_call(
+            payload['from_address'],
+            payload['to_address'],
+            [event.payload['token_id'] for event in batch],
+            [token_amount(event.payload['amount']) for event in batch]
+        )
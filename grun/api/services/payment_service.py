@@ -2,7 +2,7 @@ import stripe
 from django.conf import settings
 from django.core.mail import send_mail
 from ..models import Payment, Receipt, Transaction
-from ..blockchain.web3_handler import Web3Handler
+from ..blockchain.web3_handler import get_web3_handler
 import logging
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -10,25 +10,29 @@ logger = logging.getLogger(__name__)
 
 class PaymentService:
     @staticmethod
-    async def create_fiat_payment_session(transaction: Transaction) -> dict:
+    def create_fiat_payment_session(transaction: Transaction) -> dict:
         try:
-            # Create Stripe payment intent
+            # Create Stripe payment intent; retries for the same transaction
+            # get the original intent back instead of a second charge
             payment_intent = stripe.PaymentIntent.create(
                 amount=int(transaction.total_amount * 100),  # Convert to cents
                 currency='usd',
                 metadata={
                     'transaction_id': str(transaction.id),
-                    'credit_id': str(transaction.carbon_credit.id),
+                    'credit_id': str(transaction.carbon_credit_id),
                 },
                 payment_method_types=['card'],
+                idempotency_key=f'payment-intent-{transaction.id}',
             )
 
             # Create payment record
-            payment = Payment.objects.create(
+            payment, _ = Payment.objects.get_or_create(
                 transaction=transaction,
-                payment_type='FIAT',
-                amount=transaction.total_amount,
-                stripe_payment_intent=payment_intent.id
+                defaults={
+                    'payment_type': 'FIAT',
+                    'amount': transaction.total_amount,
+                    'stripe_payment_intent': payment_intent.id,
+                }
             )
 
             return {
@@ -42,7 +46,7 @@ class PaymentService:
     @staticmethod
     async def process_crypto_payment(transaction: Transaction, tx_hash: str) -> bool:
         try:
-            web3_handler = Web3Handler()
+            web3_handler = get_web3_handler()
             # Verify the transaction on blockchain
             tx_verified = await web3_handler.verify_payment_transaction(
                 tx_hash,
@@ -0,0 +1,123 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from ..exceptions import CreditNotMintedError, InsufficientCreditsError
+from ..models import CarbonCredit, Reservation, Transaction, User
+from .inventory_service import InventoryService
+from .outbox_service import OutboxService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ReservationService:
+    """Expiring holds on credit inventory, settled by the chain transfer in the background"""
+
+    @staticmethod
+    def place(buyer: User, credit: CarbonCredit, quantity: Decimal) -> Reservation:
+        from ..tasks import settle_reservation
+
+        with transaction.atomic():
+            reservation = ReservationService._hold(buyer, credit, quantity)
+            transaction.on_commit(lambda: settle_reservation.delay(str(reservation.id)))
+
+        return reservation
+
+    @staticmethod
+    def place_many(buyer: User, lines: list, all_or_nothing: bool = False) -> list:
+        """Hold several lines in one transaction; each result is a Reservation or the line's error"""
+        from ..tasks import settle_reservations
+
+        results = [None] * len(lines)
+        with transaction.atomic():
+            # Same lock order for every bulk buyer, so overlapping baskets cannot deadlock
+            order = sorted(range(len(lines)), key=lambda index: str(lines[index]['carbon_credit'].pk))
+            for index in order:
+                line = lines[index]
+                try:
+                    results[index] = ReservationService._hold(buyer, line['carbon_credit'], line['quantity'])
+                except (CreditNotMintedError, InsufficientCreditsError) as e:
+                    if all_or_nothing:
+                        # Keeps its own code, so an unminted credit is not reported as sold out
+                        raise type(e)(f"Line {index}: {e.detail}")
+                    results[index] = e
+
+            held = [str(result.id) for result in results if isinstance(result, Reservation)]
+            if held:
+                # One settlement run, so the transfers reach the outbox relay together
+                transaction.on_commit(lambda: settle_reservations.delay(held))
+
+        return results
+
+    @staticmethod
+    def _hold(buyer: User, credit: CarbonCredit, quantity: Decimal) -> Reservation:
+        if credit.token_id is None:
+            raise CreditNotMintedError()
+        # Conditional decrement: raises instead of overselling, before anything is written
+        InventoryService.take(credit, quantity)
+
+        purchase = Transaction.objects.create(
+            buyer=buyer,
+            seller_id=credit.owner_id,
+            carbon_credit=credit,
+            quantity=quantity,
+            price_per_credit=credit.price_per_credit,
+            total_amount=quantity * credit.price_per_credit
+        )
+        return Reservation.objects.create(
+            buyer=buyer,
+            carbon_credit=credit,
+            transaction=purchase,
+            quantity=quantity,
+            expires_at=timezone.now() + timedelta(seconds=settings.RESERVATION_TTL)
+        )
+
+    @staticmethod
+    def settle(reservation_ids: list) -> int:
+        """Queue the chain transfers for held reservations"""
+        with transaction.atomic():
+            reservations = list(
+                Reservation.objects
+                .select_for_update(of=('self',))
+                .select_related('transaction__buyer', 'transaction__carbon_credit__owner')
+                .filter(pk__in=reservation_ids, status='HELD', expires_at__gt=timezone.now())
+            )
+            # Others are already settling, or expired and left for the sweeper
+            payloads = []
+            settling = []
+            for reservation in reservations:
+                try:
+                    payloads.append(OutboxService.transfer_payload(reservation.transaction))
+                except Exception as e:
+                    # One bad line is released; the rest of the basket still settles
+                    logger.error(f"Cannot settle reservation {reservation.id}: {str(e)}")
+                    ReservationService.release(reservation)
+                    continue
+                settling.append(reservation.id)
+            OutboxService.publish_many('chain.transfer', payloads)
+            Reservation.objects.filter(pk__in=settling).update(status='SETTLING', updated_at=timezone.now())
+        return len(settling)
+
+    @staticmethod
+    def release(reservation: Reservation) -> None:
+        """Give the held credits back to the listing; caller holds the row lock"""
+        InventoryService.give_back(reservation.carbon_credit_id, reservation.quantity)
+        reservation.status = 'RELEASED'
+        reservation.save()
+        Transaction.objects.filter(pk=reservation.transaction_id).update(status='FAILED')
+
+    @staticmethod
+    def release_expired() -> int:
+        with transaction.atomic():
+            expired = list(
+                Reservation.objects
+                .select_for_update(skip_locked=True)
+                .filter(status='HELD', expires_at__lte=timezone.now())
+            )
+            for reservation in expired:
+                ReservationService.release(reservation)
+        if expired:
+            logger.info(f"Released {len(expired)} expired reservations")
+        return len(expired)
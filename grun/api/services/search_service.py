@@ -0,0 +1,110 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Case, CharField, F, FloatField, Func, Q, Value, When
+from ..models import CarbonCredit
+import uuid
+
+FACETS = ('verifier', 'status', 'price')
+
+# GROUPING() bitmask for each grouping set: a bit is set for every column not grouped on
+GROUPING_SETS = {
+    0b011: 'verifier',
+    0b101: 'status',
+    0b110: 'price',
+    0b111: 'total',
+}
+
+
+def price_bucket():
+    whens = []
+    lower = 0
+    for upper in settings.SEARCH_PRICE_BUCKETS:
+        whens.append(When(price_per_credit__lt=upper, then=Value(f'{lower}-{upper}')))
+        lower = upper
+    return Case(*whens, default=Value(f'{lower}+'), output_field=CharField())
+
+
+class SearchService:
+    """Full-text listing search over the generated tsvector, with facet counts"""
+
+    @staticmethod
+    def filter(params: dict):
+        queryset = CarbonCredit.objects.filter(status__in=('VERIFIED', 'RETIRED'))
+        if params.get('q'):
+            queryset = queryset.filter(
+                search_vector=SearchQuery(params['q'], search_type='websearch', config='english')
+            )
+        lookups = {
+            'verifier': 'verifier__iexact',
+            'status': 'status',
+            'min_price': 'price_per_credit__gte',
+            'max_price': 'price_per_credit__lte',
+            'vintage_from': 'issuance_date__gte',
+            'vintage_to': 'issuance_date__lte',
+            'expires_after': 'expiry_date__gte',
+            'expires_before': 'expiry_date__lte',
+        }
+        return queryset.filter(**{
+            lookup: params[name] for name, lookup in lookups.items() if params.get(name) not in (None, '')
+        })
+
+    @staticmethod
+    def results(queryset, params: dict, limit: int):
+        """Best matches first, or newest first without ?q=, starting after params['cursor']"""
+        queryset = queryset.select_related('owner')
+        ordering = ('-created_at', '-id')
+        if params.get('q'):
+            query = SearchQuery(params['q'], search_type='websearch', config='english')
+            queryset = queryset.annotate(rank=SearchRank(F('search_vector'), query))
+            ordering = ('-rank', *ordering)
+        if params.get('cursor'):
+            rank, created_at, pk = params['cursor']
+            after = Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+            if rank is not None:
+                # ts_rank is a real; compared as a double the cursor's copy never equals it
+                rank = Func(Value(rank), template='%(expressions)s::real', output_field=FloatField())
+                after = Q(rank__lt=rank) | (Q(rank=rank) & after)
+            queryset = queryset.filter(after)
+        return queryset.order_by(*ordering)[:limit]
+
+    @staticmethod
+    def encode_cursor(row: dict) -> str:
+        """Position of a .values() row with id, created_at and, when ranked, rank"""
+        raw = f"{row.get('rank', '')}|{row['created_at'].isoformat()}|{row['id']}"
+        return urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(encoded: str) -> tuple:
+        """(rank or None, created_at, id); ValueError when it is not one of ours"""
+        rank, created_at, pk = urlsafe_b64decode(encoded.encode()).decode().split('|')
+        return float(rank) if rank else None, datetime.fromisoformat(created_at), uuid.UUID(pk)
+
+    @staticmethod
+    def facets(queryset) -> dict:
+        """Counts per verifier, status and price bucket plus the total, in one GROUPING SETS query"""
+        matches = queryset.order_by().annotate(price=price_bucket()).values('verifier', 'status', 'price')
+        sql, params = matches.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT verifier, status, price, GROUPING(verifier, status, price), COUNT(*) '
+                f'FROM ({sql}) AS matches '
+                f'GROUP BY GROUPING SETS ((verifier), (status), (price), ())',
+                params
+            )
+            rows = cursor.fetchall()
+
+        facets = {name: [] for name in FACETS}
+        total = 0
+        for verifier, status, price, grouping, count in rows:
+            facet = GROUPING_SETS[grouping]
+            if facet == 'total':
+                total = count
+                continue
+            value = {'verifier': verifier, 'status': status, 'price': price}[facet]
+            facets[facet].append({'value': value, 'count': count})
+        for values in facets.values():
+            values.sort(key=lambda item: -item['count'])
+        return {'count': total, 'facets': facets}
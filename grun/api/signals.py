@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from .caching import listings_changed
+from .models import CarbonCredit, User
+from .serializers import UserSerializer
+
+# owner_details is nested in every listing, so edits to these make cached pages stale
+OWNER_FIELDS = frozenset(UserSerializer.Meta.fields)
+
+
+@receiver(post_init, sender=CarbonCredit)
+def remember_status(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred status does not cost a query per row
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=CarbonCredit)
+@receiver(post_delete, sender=CarbonCredit)
+def invalidate_listings(sender, instance, **kwargs):
+    # Streams carry listed credits, and the change that takes one off the market;
+    # an unknown (deferred) status is published and left to the delta to sort out
+    statuses = (instance._loaded_status, instance.__dict__.get('status'))
+    listed = 'VERIFIED' in statuses or None in statuses
+    listings_changed(instance.pk if listed else None)
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=User)
+def invalidate_owner_listings(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and not OWNER_FIELDS.intersection(update_fields):
+        # last_login on every sign-in, for one
+        return
+    if CarbonCredit.objects.filter(owner=instance).exists():
+        listings_changed()
@@ -0,0 +1,160 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse, StreamingHttpResponse
+from django_redis import get_redis_connection
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from .models import CarbonCredit, User
+import asyncio
+import json
+import logging
+import secrets
+
+logger = logging.getLogger(__name__)
+
+LISTING_DELTAS_CHANNEL = 'listings:deltas'
+STREAM_TICKET_PREFIX = 'listings:stream-ticket:'
+
+
+def publish_listing_delta(credit_id) -> None:
+    """Tell every open stream about a listed credit's committed price and availability
+
+    Streams are public, so a credit that is not VERIFIED (or is gone)
+    goes out only as a removal, never with its details.
+    """
+    credit = (
+        CarbonCredit.objects
+        .filter(pk=credit_id)
+        .values('available_credits', 'price_per_credit', 'status')
+        .first()
+    )
+    if credit is None or credit['status'] != 'VERIFIED':
+        delta = {'id': str(credit_id), 'removed': True}
+    else:
+        delta = {
+            'id': str(credit_id),
+            'available_credits': str(credit['available_credits']),
+            'price_per_credit': str(credit['price_per_credit']),
+            'status': credit['status'],
+        }
+    get_redis_connection('default').publish(LISTING_DELTAS_CHANNEL, json.dumps(delta))
+
+
+class ListingBroadcaster:
+    """One Redis subscription per process, fanned out to every open stream in it"""
+
+    def __init__(self):
+        self.queues = set()
+        self.task = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=settings.LISTING_STREAM_BUFFER)
+        self.queues.add(queue)
+        if self.task is None or self.task.done():
+            self.task = asyncio.get_running_loop().create_task(self._listen())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self.queues.discard(queue)
+
+    async def _listen(self) -> None:
+        while self.queues:
+            client = aioredis.from_url(settings.CACHES['default']['LOCATION'])
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(LISTING_DELTAS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        self._fan_out(message['data'].decode())
+            except (RedisError, OSError) as e:
+                logger.warning(f"Listing stream subscription lost, reconnecting: {str(e)}")
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # A bad message must not silently end every stream in the process
+                logger.exception("Listing stream subscription failed, reconnecting")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+    def _fan_out(self, data: str) -> None:
+        credit_id = json.loads(data)['id']
+        for queue in list(self.queues):
+            if queue.full():
+                # A client that cannot keep up loses its oldest delta rather than the connection
+                queue.get_nowait()
+            queue.put_nowait((credit_id, data))
+
+
+broadcaster = ListingBroadcaster()
+
+
+def issue_stream_ticket(user) -> str:
+    """A short-lived, single-use ticket that opens one listing stream for user
+
+    EventSource cannot set headers, and a JWT in the query string would end
+    up in proxy and access logs; a ticket there is worthless once used.
+    """
+    ticket = secrets.token_urlsafe(32)
+    cache.set(f'{STREAM_TICKET_PREFIX}{ticket}', user.pk, settings.LISTING_STREAM_TICKET_TTL)
+    return ticket
+
+
+def redeem_stream_ticket(ticket: str):
+    key = f'{STREAM_TICKET_PREFIX}{ticket}'
+    user_id = cache.get(key)
+    # Only the request whose delete removed the ticket may use it
+    if user_id is None or not cache.delete(key):
+        return None
+    return User.objects.filter(pk=user_id).first()
+
+
+def authenticate(request):
+    """?ticket= from issue_stream_ticket, or a JWT in the Authorization header"""
+    ticket = request.GET.get('ticket')
+    if ticket:
+        return redeem_stream_ticket(ticket)
+    authenticator = JWTAuthentication()
+    header = request.META.get('HTTP_AUTHORIZATION')
+    raw_token = authenticator.get_raw_token(header.encode()) if header else None
+    if not raw_token:
+        return None
+    try:
+        return authenticator.get_user(authenticator.get_validated_token(raw_token))
+    except (AuthenticationFailed, InvalidToken):
+        return None
+
+
+async def listing_events(credit_ids: set):
+    queue = broadcaster.subscribe()
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                credit_id, data = await asyncio.wait_for(queue.get(), settings.LISTING_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                # Keeps proxies and load balancers from closing an idle stream
+                yield ': keep-alive\n\n'
+                continue
+            if not credit_ids or credit_id in credit_ids:
+                yield f'event: listing\ndata: {data}\n\n'
+    finally:
+        broadcaster.unsubscribe(queue)
+
+
+async def listing_stream(request):
+    """Server-Sent Events feed of listing deltas; ?credits=<id>,<id> narrows it to those credits"""
+    user = await sync_to_async(authenticate)(request)
+    if user is None or not user.is_active:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    credit_ids = {credit_id for credit_id in request.GET.get('credits', '').split(',') if credit_id}
+    response = StreamingHttpResponse(listing_events(credit_ids), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
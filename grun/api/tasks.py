@@ -2,7 +2,11 @@ from celery import shared_task
 from django.core.mail import send_mail
 from django.conf import settings
 from .models import Document
-from .blockchain.web3_handler import Web3Handler
+from .blockchain.indexer import EventIndexer
+from .services.confirmation_service import ConfirmationService
+from .services.inventory_service import InventoryService
+from .services.outbox_service import OutboxService
+from .services.reservation_service import ReservationService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,46 +17,17 @@ def process_document_approval(document_id):
         document = Document.objects.get(id=document_id)
         carbon_credit = document.carbon_credit
 
-        # Initialize blockchain handler
-        web3_handler = Web3Handler()
-
-        # Create token on blockchain synchronously
-        token_id, tx_hash = web3_handler.create_token(
-            carbon_credit.project_name,
-            carbon_credit.verifier,
-            carbon_credit.expiry_date,
-            carbon_credit.total_credits,
-            carbon_credit.owner.wallet_address,
-            document.file_url
-        )
-
-        # Update carbon credit with token details
-        carbon_credit.token_id = token_id
-        carbon_credit.status = 'VERIFIED'
-        carbon_credit.save()
-
-        # Send email notification
-        send_mail(
-            'Carbon Credit Token Created',
-            f'''Your carbon credit has been verified and tokenized.
-            Token ID: {token_id}
-            Transaction Hash: {tx_hash}
-            Project: {carbon_credit.project_name}
-            Credits: {carbon_credit.total_credits}
-            ''',
-            settings.DEFAULT_FROM_EMAIL,
-            [carbon_credit.owner.email],
-            fail_silently=False,
+        # Hand the mint to the outbox relay; the confirmation poller
+        # finishes the approval
+        event = OutboxService.publish_mint(
+            carbon_credit,
+            document=document,
+            metadata_uri=document.file_url
         )
 
-        # Update document status
-        document.status = 'APPROVED'
-        document.save()
-
         return {
             'success': True,
-            'token_id': token_id,
-            'tx_hash': tx_hash
+            'outbox_event_id': str(event.id)
         }
 
     except Exception as e:
@@ -73,4 +48,36 @@ def process_document_approval(document_id):
             fail_silently=False,
         )
         
-        raise 
\ No newline at end of file
+        raise 
+
+@shared_task
+def poll_chain_confirmations():
+    return ConfirmationService.poll()
+
+@shared_task
+def fill_nonce_gap():
+    return ConfirmationService.fill_nonce_gap()
+
+@shared_task
+def relay_outbox():
+    return OutboxService.relay()
+
+@shared_task
+def index_chain_events():
+    return EventIndexer().run()
+
+@shared_task
+def settle_reservation(reservation_id):
+    ReservationService.settle([reservation_id])
+
+@shared_task
+def settle_reservations(reservation_ids):
+    return ReservationService.settle(reservation_ids)
+
+@shared_task
+def release_expired_reservations():
+    return ReservationService.release_expired()
+
+@shared_task
+def fold_credit_shards():
+    return InventoryService.fold_all()
@@ -0,0 +1,21 @@
+from contextlib import contextmanager
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(limit: int, label: str = 'Block'):
+    """Fail when the block runs more than limit queries, listing them all
+
+    Meant for list endpoints: run the same request at the smallest and the
+    largest page size under one budget and any per-row query shows up.
+    """
+    with CaptureQueriesContext(connection) as context:
+        yield context
+    if len(context) > limit:
+        queries = '\n'.join(f"  {query['sql']}" for query in context.captured_queries)
+        raise QueryBudgetExceeded(f"{label} ran {len(context)} queries, budget is {limit}:\n{queries}")
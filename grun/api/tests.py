@@ -1,3 +1,577 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from .blockchain.fee_oracle import FeeOracle
+from .blockchain.nonce_manager import LocalNonceManager
+from .blockchain.read_cache import MISSING, BlockAwareCache
+from .blockchain.web3_handler import CONTRACT_ARTIFACT, Web3Handler
+from .caching import bump_listings_generation, cached_listing, listings_generation
+from .exchange.order_book import BookOrder, OrderBook
+from .fieldsets import prune
+from .models import User, CarbonCredit, ChainTransaction, Transaction, Document, Order
+from .plans import ReadPlan
+from .serializers import CarbonCreditSerializer, TransactionSerializer
+from .services.confirmation_service import ConfirmationService
+from .services.search_service import SearchService
+from .testing import QueryBudgetExceeded, query_budget
+from types import SimpleNamespace
+from unittest import skipUnless
+import hashlib
+import json
+import os
 
-# Create your tests here.
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def make_credit(owner, **fields):
+    today = timezone.now().date()
+    defaults = {
+        'project_name': 'Mangrove restoration',
+        'verifier': 'Verra',
+        'issuance_date': today,
+        'expiry_date': today + timedelta(days=365),
+        'total_credits': Decimal(1000),
+        'available_credits': Decimal(1000),
+        'status': 'VERIFIED',
+        'price_per_credit': Decimal(10),
+    }
+    defaults.update(fields)
+    return CarbonCredit.objects.create(owner=owner, **defaults)
+
+
+# Presigned download URLs are signed locally, so any credentials will do
+@override_settings(
+    CACHES=LOCAL_CACHE,
+    AWS_STORAGE_BUCKET_NAME='grun-test',
+    AWS_ACCESS_KEY_ID='test',
+    AWS_SECRET_ACCESS_KEY='test'
+)
+class ListQueryBudgetTests(TestCase):
+    """List endpoints run the same number of queries for one row as for a full page"""
+    ROWS = 30
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username='admin', role='ADMIN')
+        for i in range(cls.ROWS):
+            # One owner and one buyer per credit, so a missing select_related costs a query per row
+            owner = User.objects.create(username=f'owner-{i}', role='SELLER')
+            buyer = User.objects.create(username=f'buyer-{i}', role='BUYER')
+            credit = make_credit(owner, project_name=f'Project {i}', token_id=str(i))
+            Transaction.objects.create(
+                buyer=buyer,
+                seller=owner,
+                carbon_credit=credit,
+                quantity=Decimal(1),
+                price_per_credit=credit.price_per_credit,
+                total_amount=credit.price_per_credit,
+                status='COMPLETED'
+            )
+            Document.objects.create(
+                carbon_credit=credit,
+                file_name='certificate.pdf',
+                file_type='application/pdf',
+                file_size=1024,
+                file_url='documents/certificate.pdf'
+            )
+            Order.objects.create(
+                user=cls.admin,
+                carbon_credit=credit,
+                side='BUY',
+                price=Decimal(10),
+                quantity=Decimal(1),
+                remaining=Decimal(1),
+                sequence=i + 1
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def assertWithinBudget(self, path, budget):
+        for page_size in (1, self.ROWS):
+            with self.subTest(page_size=page_size):
+                with query_budget(budget, f'{path}?page_size={page_size}'):
+                    response = self.client.get(path, {'page_size': page_size})
+                self.assertEqual(response.status_code, 200)
+
+    def test_credits(self):
+        self.assertWithinBudget('/api/credits/', 1)
+
+    def test_listings(self):
+        self.assertWithinBudget('/api/listings/', 1)
+
+    def test_listing_search(self):
+        # Facets, then results
+        self.assertWithinBudget('/api/listings/search/', 2)
+
+    def test_transactions(self):
+        self.assertWithinBudget('/api/transactions/', 1)
+
+    def test_documents(self):
+        # ETag aggregate, then the page
+        self.assertWithinBudget('/api/documents/', 2)
+
+    def test_orders(self):
+        # Count, then the page
+        self.assertWithinBudget('/api/orders/', 2)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class CachedListingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_stale_copy_keeps_its_generation(self):
+        self.assertEqual(cached_listing('page', lambda: 'old'), (0, 'old'))
+        bump_listings_generation()
+        # Another worker is refreshing the page, so the old copy is served meanwhile
+        lock_key = f"listings:page:{hashlib.sha1(b'page').hexdigest()}:lock"
+        cache.add(lock_key, 1)
+        self.assertEqual(cached_listing('page', lambda: 'new'), (0, 'old'))
+        cache.delete(lock_key)
+        self.assertEqual(cached_listing('page', lambda: 'new'), (1, 'new'))
+
+    def test_owner_edits_make_listings_stale(self):
+        owner = User.objects.create(username='owner', role='SELLER')
+        make_credit(owner)
+        generation = listings_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            owner.save(update_fields=['last_login'])
+        self.assertEqual(listings_generation(), generation)
+        owner.organization_name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            owner.save()
+        self.assertEqual(listings_generation(), generation + 1)
+
+    def test_only_listed_credits_are_streamed(self):
+        owner = User.objects.create(username='owner', role='SELLER')
+        # Each save queues the generation bump, plus a stream delta when one goes out
+        with self.captureOnCommitCallbacks() as callbacks:
+            credit = make_credit(owner, status='PENDING')
+        self.assertEqual(len(callbacks), 1)
+        for status, queued in (('VERIFIED', 2), ('REJECTED', 2), ('PENDING', 1)):
+            with self.subTest(status=status):
+                credit.status = status
+                with self.captureOnCommitCallbacks() as callbacks:
+                    credit.save()
+                self.assertEqual(len(callbacks), queued)
+
+
+@override_settings(CACHES=LOCAL_CACHE, ALLOWED_HOSTS=['*'])
+class ListingsViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.buyer = User.objects.create(username='buyer', role='BUYER')
+        owner = User.objects.create(username='owner', role='SELLER')
+        for i in range(3):
+            make_credit(owner, project_name=f'Project {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def test_cached_page_links_follow_each_request(self):
+        first = self.client.get('/api/listings/', {'page_size': 1}, HTTP_HOST='a.example')
+        second = self.client.get('/api/listings/', {'page_size': 1}, HTTP_HOST='b.example')
+        self.assertEqual(first.data['results'], second.data['results'])
+        self.assertTrue(first.data['next'].startswith('http://a.example/api/listings/'))
+        self.assertTrue(second.data['next'].startswith('http://b.example/api/listings/'))
+        self.assertEqual(first['ETag'], second['ETag'])
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class AdminVerifyCreditTests(TestCase):
+
+    def test_only_status_is_written(self):
+        admin = User.objects.create(username='admin', role='ADMIN')
+        credit = make_credit(User.objects.create(username='owner', role='SELLER'), status='PENDING', token_id='1')
+        client = APIClient()
+        client.force_authenticate(admin)
+        with CaptureQueriesContext(connection) as context:
+            response = client.patch(f'/api/admin/verify-credit/{credit.pk}/', {'action': 'verify'})
+        self.assertEqual(response.status_code, 200)
+        updates = [query['sql'] for query in context if query['sql'].startswith('UPDATE "carbon_credits"')]
+        self.assertEqual(len(updates), 1)
+        # Would otherwise overwrite concurrent F() decrements
+        self.assertNotIn('available_credits', updates[0])
+        credit.refresh_from_db()
+        self.assertEqual(credit.status, 'VERIFIED')
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class BulkPurchaseTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.buyer = User.objects.create(username='buyer', role='BUYER')
+        owner = User.objects.create(username='owner', role='SELLER')
+        cls.minted = make_credit(owner, token_id='1')
+        cls.unminted = make_credit(owner)
+
+    def test_all_or_nothing_reports_the_failing_lines_own_error(self):
+        client = APIClient()
+        client.force_authenticate(self.buyer)
+        response = client.post('/api/purchase/bulk/', {
+            'lines': [
+                {'carbon_credit': str(self.minted.pk), 'quantity': '1'},
+                {'carbon_credit': str(self.unminted.pk), 'quantity': '1'},
+            ],
+            'all_or_nothing': True,
+        }, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['detail'].code, 'credit_not_minted')
+        self.assertEqual(str(response.data['detail']), 'Line 1: Credit has no token on chain yet')
+        self.assertFalse(Transaction.objects.exists())
+
+
+class QueryBudgetTests(TestCase):
+
+    def test_within_budget(self):
+        with query_budget(1) as context:
+            list(User.objects.all())
+        self.assertEqual(len(context), 1)
+
+    def test_over_budget_lists_every_query(self):
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            with query_budget(1, 'Two lookups'):
+                User.objects.filter(username='a').exists()
+                User.objects.filter(username='b').exists()
+        message = str(raised.exception)
+        self.assertIn('Two lookups ran 2 queries, budget is 1', message)
+        self.assertEqual(message.count('SELECT'), 2)
+
+
+@override_settings(WEB3_GAS_MARGIN=1.2, WEB3_CACHED_GAS_MARGIN=1.1)
+class GasLimitTests(SimpleTestCase):
+
+    def setUp(self):
+        self.oracle = FeeOracle(None, lambda: 1)
+        self.estimates = 0
+
+    def call(self, fn_name, *args):
+        def estimate_gas(transaction):
+            self.estimates += 1
+            return 100000
+        return SimpleNamespace(fn_name=fn_name, args=args, estimate_gas=estimate_gas)
+
+    def test_mints_are_estimated_once_per_shape(self):
+        limits = [self.oracle.gas_limit(self.call('mintCreditBatch', ['Forest'], [100]), '0xadmin') for _ in range(3)]
+        self.assertEqual(limits, [132000] * 3)
+        self.assertEqual(self.estimates, 1)
+        # A longer project name is a different shape
+        self.oracle.gas_limit(self.call('mintCreditBatch', ['F' * 40], [100]), '0xadmin')
+        self.assertEqual(self.estimates, 2)
+
+    def test_transfers_are_estimated_every_time(self):
+        for _ in range(3):
+            self.assertEqual(self.oracle.gas_limit(self.call('safeBatchTransferFrom', '0xa', '0xb', [1], [1], b''), '0xadmin'), 120000)
+        self.assertEqual(self.estimates, 3)
+
+
+class LocalNonceManagerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.chain_nonce = 5
+        eth = SimpleNamespace(get_transaction_count=lambda address, block: self.chain_nonce)
+        self.nonces = LocalNonceManager(SimpleNamespace(eth=eth), '0xadmin')
+
+    def test_allocate_seeds_from_the_chain(self):
+        self.assertIsNone(self.nonces.peek())
+        self.assertEqual([self.nonces.allocate() for _ in range(3)], [5, 6, 7])
+        self.assertEqual(self.nonces.peek(), 8)
+
+    def test_release_at_the_top_winds_the_counter_back(self):
+        for _ in range(3):
+            self.nonces.allocate()
+        self.nonces.release(6)
+        self.assertEqual(self.nonces.peek(), 8)
+        # 7 is the top, and takes the parked 6 down with it
+        self.nonces.release(7)
+        self.assertEqual(self.nonces.peek(), 6)
+        self.assertEqual(self.nonces.free, set())
+
+    def test_released_nonces_are_reused_first(self):
+        for _ in range(3):
+            self.nonces.allocate()
+        self.nonces.release(5)
+        self.assertEqual(self.nonces.allocate(), 5)
+        self.assertEqual(self.nonces.allocate(), 8)
+
+    def test_resync_only_moves_forward(self):
+        for _ in range(3):
+            self.nonces.allocate()
+        self.nonces.release(5)
+        self.chain_nonce = 6
+        # Other workers may hold 6 and 7, which the chain has not seen yet
+        self.assertEqual(self.nonces.resync(), 8)
+        self.assertEqual(self.nonces.free, set())
+        self.chain_nonce = 10
+        self.assertEqual(self.nonces.resync(), 10)
+        self.assertEqual(self.nonces.allocate(), 10)
+
+
+@skipUnless(os.path.exists(CONTRACT_ARTIFACT), f'needs the compiled contract at {CONTRACT_ARTIFACT}')
+@override_settings(
+    CACHES=LOCAL_CACHE,
+    WEB3_BACKEND='tester',
+    WEB3_TESTER_BLOCK_TIME=0,
+    WEB3_BLOCK_TIME=0,
+    ADMIN_PRIVATE_KEY='0x' + '11' * 32
+)
+class ChainReadTests(TestCase):
+    """Reads against CarbonCredit deployed to the in-process eth-tester chain"""
+
+    def mint(self, handler, *names) -> list:
+        expiry = int((timezone.now() + timedelta(days=365)).timestamp())
+        tx_hash, raw_transaction, _ = handler.sign_transaction(handler.mint_batch_call([
+            {'project_name': name, 'verifier': 'Verra', 'expiry_timestamp': expiry, 'amount': 100, 'metadata_uri': ''}
+            for name in names
+        ]))
+        handler.broadcast(raw_transaction)
+        return handler.minted_token_ids(handler.w3.eth.wait_for_transaction_receipt(tx_hash))
+
+    def test_batched_details_match_single_reads(self):
+        handler = Web3Handler()
+        token_ids = self.mint(handler, 'Forest', 'Mangrove')
+        expected = {token_id: handler.get_token_details(token_id) for token_id in token_ids}
+        handler.read_cache = BlockAwareCache(16)
+        details = handler.get_tokens_details(token_ids)
+        self.assertEqual(details, expected)
+        self.assertEqual([details[token_id]['project_name'] for token_id in token_ids], ['Forest', 'Mangrove'])
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class BlockAwareCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_entries_hold_for_their_block_only(self):
+        reads = BlockAwareCache(16)
+        reads.set(('balance', 1, '0xa'), 5, 10)
+        self.assertEqual(reads.get(('balance', 1, '0xa'), 10), 5)
+        self.assertIs(reads.get(('balance', 1, '0xa'), 11), MISSING)
+        self.assertEqual(reads.stats()['hits'], 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        reads = BlockAwareCache(2)
+        reads.set_many({('metadata', 1): 'one', ('metadata', 2): 'two'}, 10)
+        reads.get(('metadata', 1), 10)
+        reads.set(('metadata', 3), 'three', 10)
+        self.assertEqual(reads.get_many([('metadata', 1), ('metadata', 2), ('metadata', 3)], 10), {
+            ('metadata', 1): 'one',
+            ('metadata', 3): 'three',
+        })
+
+    def test_invalidation_reaches_other_processes(self):
+        ours, theirs = BlockAwareCache(16), BlockAwareCache(16)
+        theirs.set_many({('balance', 1, '0xa'): 5, ('balance', 2, '0xa'): 7}, 10)
+        ours.invalidate_token(1)
+        self.assertEqual(theirs.get_many([('balance', 1, '0xa'), ('balance', 2, '0xa')], 10), {('balance', 2, '0xa'): 7})
+
+    def test_confirmed_transfer_invalidates_the_balance(self):
+        seller = User.objects.create(username='seller', role='SELLER')
+        buyer = User.objects.create(username='buyer', role='BUYER')
+        credit = make_credit(seller, token_id='3')
+        purchase = Transaction.objects.create(
+            buyer=buyer,
+            seller=seller,
+            carbon_credit=credit,
+            quantity=Decimal(2),
+            price_per_credit=credit.price_per_credit,
+            total_amount=credit.price_per_credit * 2
+        )
+        chain_tx = ChainTransaction.objects.create(action='TRANSFER', tx_hash='0x1', transaction=purchase)
+        reads = BlockAwareCache(16)
+        reads.set(('balance', 3, '0xbuyer'), 0, 10)
+        ConfirmationService._confirm(chain_tx, {})
+        self.assertIs(reads.get(('balance', 3, '0xbuyer'), 10), MISSING)
+        purchase.refresh_from_db()
+        self.assertEqual(purchase.status, 'COMPLETED')
+
+
+class OrderBookTests(SimpleTestCase):
+
+    def order(self, id, side, price, quantity, user_id=None):
+        # Every order has its own owner unless a test says otherwise
+        return BookOrder(id, id if user_id is None else user_id, side, Decimal(price), Decimal(quantity), id)
+
+    def test_rests_when_nothing_crosses(self):
+        book = OrderBook()
+        self.assertEqual(book.submit(self.order(1, 'BUY', '10', '5')), [])
+        self.assertEqual(book.submit(self.order(2, 'SELL', '11', '5')), [])
+        self.assertEqual(book.depth(5), {'bids': [['10', '5']], 'asks': [['11', '5']]})
+
+    def test_fills_at_resting_price_in_time_priority(self):
+        book = OrderBook()
+        first = self.order(1, 'SELL', '10', '3')
+        second = self.order(2, 'SELL', '10', '3')
+        book.submit(first)
+        book.submit(second)
+        buy = self.order(3, 'BUY', '12', '4')
+        fills = book.submit(buy)
+        self.assertEqual(
+            [(fill.buy, fill.sell, fill.price, fill.quantity) for fill in fills],
+            [(buy, first, Decimal('10'), Decimal('3')), (buy, second, Decimal('10'), Decimal('1'))]
+        )
+        self.assertNotIn(1, book.orders)
+        self.assertEqual(second.remaining, Decimal('2'))
+        self.assertEqual(book.depth(5), {'bids': [], 'asks': [['10', '2']]})
+
+    def test_walks_price_levels_best_first_and_rests_the_rest(self):
+        book = OrderBook()
+        for id, price in ((1, '9'), (2, '11'), (3, '10')):
+            book.submit(self.order(id, 'BUY', price, '1'))
+        fills = book.submit(self.order(4, 'SELL', '10', '5'))
+        self.assertEqual([fill.price for fill in fills], [Decimal('11'), Decimal('10')])
+        self.assertEqual(book.depth(5), {'bids': [['9', '1']], 'asks': [['10', '3']]})
+
+    def test_cancel_removes_empty_level(self):
+        book = OrderBook()
+        book.submit(self.order(1, 'BUY', '10', '1'))
+        book.submit(self.order(2, 'BUY', '9', '1'))
+        self.assertEqual(book.cancel(1).id, 1)
+        self.assertIsNone(book.cancel(1))
+        self.assertEqual(book.prices['BUY'], [Decimal('9')])
+        self.assertEqual(book.depth(5), {'bids': [['9', '1']], 'asks': []})
+
+    def test_never_crosses_its_owners_resting_order(self):
+        book = OrderBook()
+        book.submit(self.order(1, 'SELL', '10', '1', user_id=7))
+        book.submit(self.order(2, 'SELL', '11', '1', user_id=8))
+        incoming = self.order(3, 'BUY', '11', '2', user_id=7)
+        self.assertEqual(book.submit(incoming), [])
+        # Cancelled rather than rested, so the book is never crossed
+        self.assertNotIn(3, book.orders)
+        self.assertEqual(incoming.remaining, Decimal('2'))
+        self.assertEqual(book.depth(5), {'bids': [], 'asks': [['10', '1'], ['11', '1']]})
+
+    def test_depth_aggregates_and_limits_levels(self):
+        book = OrderBook()
+        book.submit(self.order(1, 'SELL', '10', '1'))
+        book.submit(self.order(2, 'SELL', '10', '2'))
+        book.submit(self.order(3, 'SELL', '12', '1'))
+        self.assertEqual(book.depth(1), {'bids': [], 'asks': [['10', '3']]})
+
+
+@override_settings(SEARCH_PRICE_BUCKETS=[10, 25])
+class SearchFacetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username='owner', role='SELLER')
+        for verifier, status, price in (
+            ('Verra', 'VERIFIED', 5),
+            ('Verra', 'VERIFIED', 15),
+            ('Verra', 'RETIRED', 30),
+            ('Gold Standard', 'VERIFIED', 15),
+            ('Gold Standard', 'PENDING', 15),
+        ):
+            make_credit(owner, verifier=verifier, status=status, price_per_credit=Decimal(price))
+
+    def counts(self, facets) -> dict:
+        for values in facets['facets'].values():
+            counts = [item['count'] for item in values]
+            self.assertEqual(counts, sorted(counts, reverse=True))
+        return {name: {item['value']: item['count'] for item in values} for name, values in facets['facets'].items()}
+
+    def test_grouping_sets_decode_to_their_facets(self):
+        facets = SearchService.facets(SearchService.filter({}))
+        # The pending credit is not searchable
+        self.assertEqual(facets['count'], 4)
+        self.assertEqual(self.counts(facets), {
+            'verifier': {'Verra': 3, 'Gold Standard': 1},
+            'status': {'VERIFIED': 3, 'RETIRED': 1},
+            'price': {'0-10': 1, '10-25': 2, '25+': 1},
+        })
+
+    def test_facets_follow_filters(self):
+        facets = SearchService.facets(SearchService.filter({'verifier': 'gold standard'}))
+        self.assertEqual(facets['count'], 1)
+        self.assertEqual(self.counts(facets), {
+            'verifier': {'Gold Standard': 1},
+            'status': {'VERIFIED': 1},
+            'price': {'10-25': 1},
+        })
+
+
+class SearchPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username='owner', role='SELLER')
+        for i in range(7):
+            make_credit(owner, project_name=f'Forest {i}' if i % 2 else f'Forest forest {i}')
+
+    def walk(self, params: dict) -> list:
+        columns = ('id', 'created_at', 'rank') if params.get('q') else ('id', 'created_at')
+        seen = []
+        while True:
+            rows = list(SearchService.results(SearchService.filter(params), params, 3).values(*columns))
+            seen += [row['id'] for row in rows]
+            if len(rows) < 3:
+                return seen
+            params = {**params, 'cursor': SearchService.decode_cursor(SearchService.encode_cursor(rows[-1]))}
+
+    def test_cursor_walks_every_result_once(self):
+        for params in ({}, {'q': 'forest'}):
+            with self.subTest(**params):
+                expected = list(SearchService.results(SearchService.filter(params), params, 100).values_list('id', flat=True))
+                self.assertEqual(len(expected), 7)
+                self.assertEqual(self.walk(params), expected)
+
+
+class ReadPlanTests(TestCase):
+    """A ReadPlan renders .values() rows to the same JSON as its serializer"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username='owner', role='SELLER', organization_name='Owner Org')
+        buyer = User.objects.create(username='buyer', role='BUYER')
+        cls.credit = make_credit(owner, token_id='7', price_per_credit=Decimal('12.34'))
+        cls.unminted = make_credit(owner, available_credits=Decimal('750.50'))
+        cls.purchase = Transaction.objects.create(
+            buyer=buyer,
+            seller=owner,
+            carbon_credit=cls.credit,
+            quantity=Decimal('2.00'),
+            price_per_credit=cls.credit.price_per_credit,
+            total_amount=cls.credit.price_per_credit * 2
+        )
+
+    def assertSameJSON(self, serializer_class, queryset, fields=None, expand=None):
+        expected = [prune(serializer_class(instance), fields, expand).data for instance in queryset]
+        plan = ReadPlan.for_serializer(serializer_class, fields, expand)
+        actual = plan.represent_many(queryset.values(*plan.columns))
+        self.assertEqual(json.loads(JSONRenderer().render(actual)), json.loads(JSONRenderer().render(expected)))
+
+    def test_credits(self):
+        self.assertSameJSON(CarbonCreditSerializer, CarbonCredit.objects.order_by('created_at'))
+
+    def test_transactions(self):
+        self.assertSameJSON(TransactionSerializer, Transaction.objects.all())
+
+    def test_selected_fields(self):
+        self.assertSameJSON(
+            CarbonCreditSerializer, CarbonCredit.objects.order_by('created_at'),
+            fields=frozenset({'id', 'token_id', 'price_per_credit', 'owner_details'})
+        )
+
+    def test_dotted_expand(self):
+        self.assertSameJSON(
+            TransactionSerializer, Transaction.objects.all(),
+            expand=frozenset({'carbon_credit_details.owner_details'})
+        )
+
+    def test_nothing_expanded(self):
+        self.assertSameJSON(TransactionSerializer, Transaction.objects.all(), expand=frozenset())
@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from . import views
-from .views import payment_views
+from .streaming import listing_stream
 
 router = DefaultRouter()
 router.register(r'documents', views.DocumentViewSet, basename='document')
@@ -20,10 +20,21 @@ urlpatterns = [
     path('credits/', views.CarbonCreditListCreateView.as_view(), name='carbon-credits'),
     path('credits/<uuid:pk>/', views.CarbonCreditDetailView.as_view(), name='carbon-credit-detail'),
     path('listings/', views.CarbonCreditListingsView.as_view(), name='listings'),
+    path('listings/search/', views.ListingSearchView.as_view(), name='listing-search'),
+    path('listings/stream/', listing_stream, name='listing-stream'),
+    path('listings/stream/ticket/', views.create_stream_ticket, name='listing-stream-ticket'),
+    path('tokens/<int:token_id>/', views.ChainTokenDetailView.as_view(), name='chain-token-detail'),
+
+    # Order book endpoints
+    path('orders/', views.OrderListCreateView.as_view(), name='orders'),
+    path('orders/<uuid:pk>/', views.OrderCancelView.as_view(), name='order-cancel'),
+    path('credits/<uuid:pk>/book/', views.OrderBookView.as_view(), name='order-book'),
     
     # Transaction endpoints
     path('purchase/', views.TransactionCreateView.as_view(), name='purchase'),
+    path('purchase/bulk/', views.BulkPurchaseView.as_view(), name='bulk-purchase'),
     path('transactions/', views.TransactionListView.as_view(), name='transactions'),
+    path('transactions/<uuid:pk>/payment/', views.create_payment_session, name='payment-session'),
     
     # Admin endpoints
     path('admin/verify-credit/<uuid:pk>/', views.AdminVerifyCreditView.as_view(), name='verify-credit'),
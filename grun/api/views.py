@@ -1,15 +1,28 @@
-from rest_framework import generics, permissions, status, viewsets
+from rest_framework import generics, permissions, serializers, status, viewsets
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.utils.urls import replace_query_param
 from django.db import transaction
-from django.core.cache import cache
+from django.db.models import Count, Max, Q
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from .models import User, CarbonCredit, Transaction, Document
-from .serializers import UserSerializer, CarbonCreditSerializer, TransactionSerializer, DocumentSerializer, DocumentUploadSerializer
+from .models import User, CarbonCredit, Transaction, Document, ChainToken, Order, Reservation
+from .serializers import UserSerializer, CarbonCreditSerializer, TransactionSerializer, DocumentSerializer, DocumentUploadSerializer, ChainTokenSerializer, PurchaseSerializer, ReservationSerializer, OrderSerializer, BulkPurchaseSerializer, ListingSearchSerializer
 from .permissions import IsAdminUser, IsBuyerUser, IsSellerUser
-from .blockchain.web3_handler import Web3Handler
 from .tasks import process_document_approval
+from .idempotency import idempotent
+from .caching import cached_listing, listings_generation, normalise_query
+from .conditional import conditional, make_etag
+from .fieldsets import EXPAND_PARAM, FIELDS_PARAM, requested, source_columns
+from .pagination import KeysetPagination
+from .plans import ReadPlan, ReadPlanListMixin
+from .services.order_service import OrderService
+from .services.outbox_service import OutboxService
+from .services.payment_service import PaymentService
+from .services.reservation_service import ReservationService
+from .services.search_service import SearchService
+from .streaming import issue_stream_ticket
 from rest_framework.exceptions import APIException
 from django.core.exceptions import ValidationError
 from .exceptions import DocumentProcessingError, BlockchainError
@@ -35,105 +48,272 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         return self.request.user
 
-class CarbonCreditListCreateView(generics.ListCreateAPIView):
+    def get_validators(self, request, *args, **kwargs):
+        return f'user|{request.user.pk}|{request.user.updated_at.isoformat()}', request.user.updated_at
+
+    @conditional
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+class CarbonCreditListCreateView(ReadPlanListMixin, generics.ListCreateAPIView):
     serializer_class = CarbonCreditSerializer
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
+        # owner_details is nested in every row
+        queryset = CarbonCredit.objects.select_related('owner')
         if self.request.user.role == 'ADMIN':
-            return CarbonCredit.objects.all()
-        return CarbonCredit.objects.filter(owner=self.request.user)
+            return queryset
+        return queryset.filter(owner=self.request.user)
 
     @transaction.atomic
     def perform_create(self, serializer):
         credit = serializer.save(owner=self.request.user)
-        try:
-            # Initialize blockchain handler
-            web3_handler = Web3Handler()
-            # Create token on blockchain
-            token_id = web3_handler.create_token(
-                credit.id,
-                credit.total_credits,
-                credit.owner.wallet_address
-            )
-            credit.token_id = token_id
-            credit.save()
-        except Exception as e:
-            logger.error(f"Blockchain error: {str(e)}")
-            raise
+        # The relay mints it once this transaction commits; no RPC while rows are locked
+        OutboxService.publish_mint(credit)
 
-class CarbonCreditListingsView(generics.ListAPIView):
+class CarbonCreditDetailView(generics.RetrieveAPIView):
     serializer_class = CarbonCreditSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_queryset(self):
-        queryset = CarbonCredit.objects.filter(
+        queryset = CarbonCredit.objects.select_related('owner')
+        if self.request.user.role == 'ADMIN':
+            return queryset
+        return queryset.filter(Q(owner=self.request.user) | Q(status='VERIFIED'))
+
+    def get_validators(self, request, *args, **kwargs):
+        # owner_details is part of the body, so the owner's profile edits count too
+        stamps = self.get_queryset().filter(pk=kwargs['pk']).values_list('updated_at', 'owner__updated_at').first()
+        if stamps is None:
+            return None, None
+        last_modified = max(stamps)
+        return f"credit|{kwargs['pk']}|{last_modified.isoformat()}", last_modified
+
+    @conditional
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+class CarbonCreditListingsView(ReadPlanListMixin, generics.ListAPIView):
+    serializer_class = CarbonCreditSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = KeysetPagination
+    # Only these parameters change the page; anything else shares the cached copy
+    cache_query_params = ('cursor', 'page_size', 'include_total', FIELDS_PARAM, EXPAND_PARAM)
+
+    def get_queryset(self):
+        return CarbonCredit.objects.filter(
             status='VERIFIED',
             available_credits__gt=0
+        ).select_related('owner')
+
+    def get_validators(self, request, *args, **kwargs):
+        # Every credit and owner change bumps the generation, so the page cannot differ without it changing
+        query = normalise_query(request.query_params, self.cache_query_params)
+        return f'listings|{listings_generation()}|{query}', None
+
+    @conditional
+    def list(self, request, *args, **kwargs):
+        def compute():
+            plan, queryset = self.planned_queryset(request)
+            # Cursors only: the links point at whatever host and path each request used
+            return self.paginator.get_page(plan.represent_many(self.paginate_queryset(queryset)))
+
+        query = normalise_query(request.query_params, self.cache_query_params)
+        generation, page = cached_listing('listings|' + query, compute)
+        response = Response(self.paginator.page_body(request, page))
+        # A previous generation's copy served during a refresh keeps its own tag
+        response['ETag'] = make_etag(request, f'listings|{generation}|{query}')
+        return response
+
+class ListingSearchView(generics.GenericAPIView):
+    """Full-text search over public credits with verifier, status and price facets"""
+    serializer_class = ListingSearchSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def cache_query(self, request) -> str:
+        return normalise_query(request.query_params, (*ListingSearchSerializer().fields, FIELDS_PARAM, EXPAND_PARAM))
+
+    def get_validators(self, request, *args, **kwargs):
+        return f'search|{listings_generation()}|{self.cache_query(request)}', None
+
+    @conditional
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        plan = ReadPlan.for_serializer(CarbonCreditSerializer, *requested(request.query_params))
+
+        def search():
+            queryset = SearchService.filter(params)
+            # The cursor is read from the last row's rank, created_at and id
+            columns = [*plan.columns, 'id', 'created_at', *(('rank',) if params.get('q') else ())]
+            rows = list(
+                SearchService.results(queryset, params, params['page_size'] + 1).values(*dict.fromkeys(columns))
+            )
+            page = rows[:params['page_size']]
+            return {
+                **SearchService.facets(queryset),
+                'results': plan.represent_many(page),
+                'next_cursor': SearchService.encode_cursor(page[-1]) if len(rows) > len(page) else None,
+            }
+
+        generation, data = cached_listing('search|' + self.cache_query(request), search)
+        data = dict(data)
+        # Built per request, since the cached page is shared whatever host it was asked for on
+        next_cursor = data.pop('next_cursor')
+        data['next'] = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor) if next_cursor else None
+        response = Response(data)
+        response['ETag'] = make_etag(request, f'search|{generation}|{self.cache_query(request)}')
+        return response
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def create_stream_ticket(request):
+    return Response({'ticket': issue_stream_ticket(request.user)}, status=status.HTTP_201_CREATED)
+
+class TransactionListView(ReadPlanListMixin, generics.ListAPIView):
+    serializer_class = TransactionSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        # Buyer, seller, credit and the credit's owner are all nested in every row
+        queryset = Transaction.objects.select_related('buyer', 'seller', 'carbon_credit__owner')
+        if self.request.user.role == 'ADMIN':
+            return queryset
+        return queryset.filter(
+            Q(buyer=self.request.user) | Q(seller=self.request.user)
         )
-        
-        # Cache the results for 5 minutes
-        cache_key = f'listings_page_{self.request.query_params.get("page", 1)}'
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return cached_data
-        
-        cache.set(cache_key, queryset, 300)
-        return queryset
 
 class TransactionCreateView(generics.CreateAPIView):
-    serializer_class = TransactionSerializer
+    serializer_class = PurchaseSerializer
     permission_classes = (permissions.IsAuthenticated, IsBuyerUser)
 
-    @transaction.atomic
-    def perform_create(self, serializer):
-        credit = serializer.validated_data['carbon_credit']
-        quantity = serializer.validated_data['quantity']
-        
-        if quantity > credit.available_credits:
-            raise serializers.ValidationError("Insufficient credits available")
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
         
-        transaction = serializer.save(
-            buyer=self.request.user,
-            seller=credit.owner,
-            total_amount=quantity * credit.price_per_credit
+        # Holds the credits without locking the listing; settlement happens in the background
+        reservation = ReservationService.place(
+            request.user,
+            serializer.validated_data['carbon_credit'],
+            serializer.validated_data['quantity']
         )
-        
-        try:
-            web3_handler = Web3Handler()
-            tx_hash = web3_handler.transfer_token(
-                credit.token_id,
-                credit.owner.wallet_address,
-                self.request.user.wallet_address,
-                quantity
-            )
-            transaction.blockchain_tx_hash = tx_hash
-            transaction.status = 'COMPLETED'
-            transaction.save()
-            
-            # Update available credits
-            credit.available_credits -= quantity
-            credit.save()
-            
-        except Exception as e:
-            transaction.status = 'FAILED'
-            transaction.save()
-            logger.error(f"Transaction failed: {str(e)}")
-            raise
+        return Response(
+            ReservationSerializer(reservation).data,
+            status=status.HTTP_202_ACCEPTED
+        )
+
+class BulkPurchaseView(generics.GenericAPIView):
+    """Reserve many credits in one request; settlement reaches the chain as batched transfers"""
+    serializer_class = BulkPurchaseSerializer
+    permission_classes = (permissions.IsAuthenticated, IsBuyerUser)
+
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        lines = serializer.validated_data['lines']
+        results = ReservationService.place_many(
+            request.user,
+            lines,
+            all_or_nothing=serializer.validated_data['all_or_nothing']
+        )
+
+        response_lines = []
+        for index, (line, result) in enumerate(zip(lines, results)):
+            reserved = isinstance(result, Reservation)
+            response_lines.append({
+                'index': index,
+                'carbon_credit': str(line['carbon_credit'].pk),
+                'quantity': str(line['quantity']),
+                'status': 'RESERVED' if reserved else 'REJECTED',
+                'reservation': ReservationSerializer(result).data if reserved else None,
+                'error': None if reserved else {'code': result.default_code, 'detail': str(result.detail)},
+            })
+        any_reserved = any(line['status'] == 'RESERVED' for line in response_lines)
+        return Response(
+            {'lines': response_lines},
+            status=status.HTTP_202_ACCEPTED if any_reserved else status.HTTP_409_CONFLICT
+        )
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@idempotent
+def create_payment_session(request, pk):
+    purchase = get_object_or_404(Transaction, pk=pk, buyer=request.user)
+    session = PaymentService.create_fiat_payment_session(purchase)
+    return Response(session, status=status.HTTP_201_CREATED)
+
+class OrderListCreateView(generics.ListCreateAPIView):
+    """Limit orders; new orders are accepted here and matched by the engine"""
+    serializer_class = OrderSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self):
+        return Order.objects.filter(user=self.request.user).order_by('-sequence')
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        order_id = OrderService.place(
+            request.user,
+            serializer.validated_data['carbon_credit'],
+            serializer.validated_data['side'],
+            serializer.validated_data['price'],
+            serializer.validated_data['quantity']
+        )
+        return Response(
+            {'id': order_id, 'status': 'PENDING'},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+class OrderCancelView(generics.DestroyAPIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get_queryset(self):
+        return Order.objects.filter(user=self.request.user, status='OPEN')
+
+    def destroy(self, request, *args, **kwargs):
+        OrderService.cancel(self.get_object())
+        return Response(status=status.HTTP_202_ACCEPTED)
+
+class OrderBookView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, pk):
+        return Response(OrderService.depth(pk))
+
+class ChainTokenDetailView(generics.RetrieveAPIView):
+    """On-chain token metadata, balances and retirements served from the event index"""
+    serializer_class = ChainTokenSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    queryset = ChainToken.objects.all()
+    lookup_field = 'token_id'
 
 class AdminVerifyCreditView(generics.UpdateAPIView):
     permission_classes = (permissions.IsAuthenticated, IsAdminUser)
-    queryset = CarbonCredit.objects.all()
+    queryset = CarbonCredit.objects.select_related('owner')
     serializer_class = CarbonCreditSerializer
 
     def perform_update(self, serializer):
         action = self.request.data.get('action')
         if action not in ['verify', 'reject']:
             raise serializers.ValidationError("Invalid action")
+        if action == 'verify' and serializer.instance.token_id is None:
+            # Purchases of it would have nothing to transfer
+            raise serializers.ValidationError("Credit cannot be verified before its mint confirms")
         
-        credit = serializer.save(
-            status='VERIFIED' if action == 'verify' else 'REJECTED'
-        )
+        credit = serializer.instance
+        credit.status = 'VERIFIED' if action == 'verify' else 'REJECTED'
+        # Purchases decrement available_credits with F() meanwhile; a full-row save would undo them
+        credit.save(update_fields=['status', 'updated_at'])
 
 class AdminBlockUserView(generics.UpdateAPIView):
     permission_classes = (permissions.IsAuthenticated, IsAdminUser)
@@ -151,19 +331,52 @@ class DocumentViewSet(viewsets.ModelViewSet):
     
     queryset = Document.objects.all()
     serializer_class = DocumentSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_field = 'upload_date'
 
     def get_queryset(self):
         if self.request.user.role == 'ADMIN':
-            return Document.objects.all()
-        return Document.objects.filter(carbon_credit__owner=self.request.user)
+            queryset = Document.objects.all()
+        else:
+            queryset = Document.objects.filter(carbon_credit__owner=self.request.user)
+        if self.action in ('list', 'retrieve'):
+            # Load only what the ?fields= / ?expand= selection will serialize
+            queryset = queryset.only('id', 'upload_date', *source_columns(self.get_serializer()))
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'upload':
             return DocumentUploadSerializer
         return DocumentSerializer
 
+    def get_validators(self, request, *args, **kwargs):
+        # download_url is presigned for an hour; rolling the version every half hour
+        # means a body the client revalidates always has links with time left on them
+        window = int(timezone.now().timestamp() // 1800)
+        if self.action == 'retrieve':
+            try:
+                updated_at = self.get_queryset().filter(pk=kwargs['pk']).values_list('updated_at', flat=True).first()
+            except (ValueError, ValidationError):
+                updated_at = None
+            if updated_at is None:
+                return None, None
+            return f"document|{kwargs['pk']}|{updated_at.isoformat()}|{window}", None
+        # Deletions lower the count and any edit raises the newest updated_at
+        stamp = self.get_queryset().aggregate(count=Count('pk'), last=Max('updated_at'))
+        query = normalise_query(request.query_params, ('cursor', 'page_size', 'include_total'))
+        return f"documents|{request.user.pk}|{stamp['count']}|{stamp['last']}|{query}|{window}", None
+
+    @conditional
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @action(detail=False, methods=['post'])
+    @idempotent
     def upload(self, request):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
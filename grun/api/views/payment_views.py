@@ -1,10 +0,0 @@
-from rest_framework import generics, status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from django.conf import settings
-from ..models import Transaction, Payment  # Updated import
-from ..services.payment_service import PaymentService  # Updated import
-from ..serializers import PaymentSerializer  # Updated import
-import stripe
-import logging 
\ No newline at end of file
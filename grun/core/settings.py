@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     
     # Third party apps
     'rest_framework',
@@ -53,6 +54,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "grun.api.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -139,6 +141,8 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "http://localhost:8000",
 ]
+from corsheaders.defaults import default_headers
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 
 # Rest Framework settings
 REST_FRAMEWORK = {
@@ -148,6 +152,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'grun.api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
@@ -190,6 +198,10 @@ AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID')
 AWS_SECRET_ACCESS_KEY = os.environ.get('AWS_SECRET_ACCESS_KEY')
 AWS_STORAGE_BUCKET_NAME = os.environ.get('AWS_STORAGE_BUCKET_NAME')
 AWS_S3_REGION_NAME = os.environ.get('AWS_S3_REGION_NAME', 'us-east-1')
+
+# Stripe
+STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY')
+STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET')
 AWS_S3_FILE_OVERWRITE = False
 AWS_DEFAULT_ACL = None
 AWS_S3_ENCRYPTION = True
@@ -220,3 +232,91 @@ DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL')
 
 # Update AUTH_USER_MODEL
 AUTH_USER_MODEL = 'api.User'
+
+# Blockchain settings
+# 'http' talks to WEB3_PROVIDER_URLS, 'tester' deploys the contract to an in-process EVM
+WEB3_BACKEND = os.environ.get('WEB3_BACKEND', 'http')
+WEB3_TESTER_BLOCK_TIME = float(os.environ.get('WEB3_TESTER_BLOCK_TIME', 0))
+WEB3_PROVIDER_URL = os.environ.get('WEB3_PROVIDER_URL', 'http://localhost:8545')
+# Comma-separated; reads go to the fastest healthy endpoint, writes stay pinned to one
+WEB3_PROVIDER_URLS = [
+    url.strip() for url in (os.environ.get('WEB3_PROVIDER_URLS') or WEB3_PROVIDER_URL).split(',') if url.strip()
+]
+WEB3_ENDPOINT_COOLDOWN = float(os.environ.get('WEB3_ENDPOINT_COOLDOWN', 5))
+CONTRACT_ADDRESS = os.environ.get('CONTRACT_ADDRESS')
+ADMIN_PRIVATE_KEY = os.environ.get('WALLET_PRIVATE_KEY')
+WEB3_POOL_SIZE = int(os.environ.get('WEB3_POOL_SIZE', 10))
+WEB3_REQUEST_TIMEOUT = int(os.environ.get('WEB3_REQUEST_TIMEOUT', 10))
+WEB3_BLOCK_TIME = float(os.environ.get('WEB3_BLOCK_TIME', 2))
+WEB3_GAS_MARGIN = float(os.environ.get('WEB3_GAS_MARGIN', 1.2))
+# Extra headroom on mint gas limits, which are estimated once per call shape and reused
+WEB3_CACHED_GAS_MARGIN = float(os.environ.get('WEB3_CACHED_GAS_MARGIN', 1.1))
+WEB3_READ_CACHE_SIZE = int(os.environ.get('WEB3_READ_CACHE_SIZE', 4096))
+WEB3_CONFIRMATION_BLOCKS = int(os.environ.get('WEB3_CONFIRMATION_BLOCKS', 3))
+WEB3_CONFIRMATION_BATCH_SIZE = int(os.environ.get('WEB3_CONFIRMATION_BATCH_SIZE', 500))
+WEB3_BATCH_WINDOW = float(os.environ.get('WEB3_BATCH_WINDOW', 5))
+WEB3_BATCH_MAX_SIZE = int(os.environ.get('WEB3_BATCH_MAX_SIZE', 100))
+# Signed transactions with no receipt after this many seconds are sent again
+WEB3_REBROADCAST_AFTER = int(os.environ.get('WEB3_REBROADCAST_AFTER', 60))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 8))
+WEB3_INDEXER_START_BLOCK = int(os.environ.get('WEB3_INDEXER_START_BLOCK', 0))
+WEB3_INDEXER_BLOCK_RANGE = int(os.environ.get('WEB3_INDEXER_BLOCK_RANGE', 2000))
+WEB3_INDEXER_REORG_DEPTH = int(os.environ.get('WEB3_INDEXER_REORG_DEPTH', 64))
+
+# Purchase holds are released if not settled within this many seconds
+RESERVATION_TTL = int(os.environ.get('RESERVATION_TTL', 300))
+BULK_PURCHASE_MAX_LINES = int(os.environ.get('BULK_PURCHASE_MAX_LINES', 100))
+
+# Listing pages stay fresh this long unless a credit changes first
+LISTINGS_CACHE_TTL = int(os.environ.get('LISTINGS_CACHE_TTL', 300))
+LISTINGS_CACHE_LOCK_TIMEOUT = int(os.environ.get('LISTINGS_CACHE_LOCK_TIMEOUT', 5))
+
+# Listing streams send a keep-alive after this many idle seconds and buffer this many deltas per client
+LISTING_STREAM_HEARTBEAT = int(os.environ.get('LISTING_STREAM_HEARTBEAT', 15))
+LISTING_STREAM_BUFFER = int(os.environ.get('LISTING_STREAM_BUFFER', 256))
+# Stream tickets must be redeemed within this many seconds
+LISTING_STREAM_TICKET_TTL = int(os.environ.get('LISTING_STREAM_TICKET_TTL', 30))
+
+# Upper bounds of the price facet buckets; the last bucket is open-ended
+SEARCH_PRICE_BUCKETS = [10, 25, 50, 100]
+
+# Idempotency-Key responses are replayed for this long; duplicates wait up to the lock timeout
+IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 86400))
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 30))
+
+# Hot credits can spread their inventory over this many rows (admin action)
+CREDIT_SHARD_COUNT = int(os.environ.get('CREDIT_SHARD_COUNT', 16))
+CREDIT_SHARD_FOLD_INTERVAL = float(os.environ.get('CREDIT_SHARD_FOLD_INTERVAL', 10))
+
+# Matching engine: commands per database transaction, published book depth, stream retention
+EXCHANGE_BATCH_SIZE = int(os.environ.get('EXCHANGE_BATCH_SIZE', 500))
+EXCHANGE_BOOK_DEPTH = int(os.environ.get('EXCHANGE_BOOK_DEPTH', 20))
+EXCHANGE_STREAM_MAXLEN = int(os.environ.get('EXCHANGE_STREAM_MAXLEN', 100000))
+
+# Periodic tasks (celery beat)
+CELERY_BEAT_SCHEDULE = {
+    'poll-chain-confirmations': {
+        'task': 'grun.api.tasks.poll_chain_confirmations',
+        'schedule': WEB3_BLOCK_TIME,
+    },
+    'fill-nonce-gap': {
+        'task': 'grun.api.tasks.fill_nonce_gap',
+        'schedule': WEB3_REBROADCAST_AFTER,
+    },
+    'relay-outbox': {
+        'task': 'grun.api.tasks.relay_outbox',
+        'schedule': WEB3_BATCH_WINDOW,
+    },
+    'index-chain-events': {
+        'task': 'grun.api.tasks.index_chain_events',
+        'schedule': WEB3_BLOCK_TIME,
+    },
+    'release-expired-reservations': {
+        'task': 'grun.api.tasks.release_expired_reservations',
+        'schedule': 30,
+    },
+    'fold-credit-shards': {
+        'task': 'grun.api.tasks.fold_credit_shards',
+        'schedule': CREDIT_SHARD_FOLD_INTERVAL,
+    },
+}
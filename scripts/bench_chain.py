@@ -0,0 +1,117 @@
+import os
+import django
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+os.environ.setdefault('WEB3_BACKEND', 'tester')
+django.setup()
+
+from eth_account import Account
+from grun.api.blockchain.web3_handler import get_web3_handler
+
+COUNT = int(os.environ.get('BENCH_COUNT', 100))
+BATCH_SIZE = int(os.environ.get('BENCH_BATCH_SIZE', 20))
+
+
+def wait_for(web3_handler, tx_hashes):
+    pending = list(tx_hashes)
+    receipts = {}
+    while pending:
+        for tx_hash, receipt in zip(pending, web3_handler.get_receipts(pending)):
+            if receipt is not None:
+                receipts[tx_hash] = receipt
+        pending = [tx_hash for tx_hash in pending if tx_hash not in receipts]
+        if pending:
+            time.sleep(0.05)
+    return receipts
+
+
+def send(web3_handler, function):
+    """Sign and broadcast the way the outbox relay does"""
+    tx_hash, raw_transaction, _ = web3_handler.sign_transaction(function)
+    web3_handler.broadcast(raw_transaction)
+    return tx_hash
+
+
+def mint_payload(project_name, expiry):
+    return {
+        'project_name': project_name,
+        'verifier': 'Bench',
+        'expiry_timestamp': int(expiry.timestamp()),
+        'amount': 1000,
+        'metadata_uri': '',
+    }
+
+
+def report(label, count, started):
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {count:>6} ops  {elapsed:8.2f}s  {count / elapsed:10.1f} ops/s")
+
+
+def main():
+    web3_handler = get_web3_handler()
+    admin = web3_handler.admin_account.address
+    buyer = Account.create().address
+    expiry = datetime.now() + timedelta(days=365)
+
+    started = time.perf_counter()
+    tx_hashes = [
+        send(web3_handler, web3_handler.mint_batch_call([mint_payload(f'Bench {i}', expiry)]))
+        for i in range(COUNT)
+    ]
+    receipts = wait_for(web3_handler, tx_hashes)
+    report('mint (single)', COUNT, started)
+    token_ids = [
+        token_id
+        for tx_hash in tx_hashes
+        for token_id in web3_handler.minted_token_ids(receipts[tx_hash])
+    ]
+
+    started = time.perf_counter()
+    batch_hashes = [
+        send(web3_handler, web3_handler.mint_batch_call([
+            mint_payload(f'Bench batch {i + j}', expiry) for j in range(BATCH_SIZE)
+        ]))
+        for i in range(0, COUNT, BATCH_SIZE)
+    ]
+    wait_for(web3_handler, batch_hashes)
+    report(f'mint (batches of {BATCH_SIZE})', COUNT, started)
+
+    started = time.perf_counter()
+    tx_hashes = [
+        send(web3_handler, web3_handler.transfer_batch_call(admin, buyer, [token_id], [10]))
+        for token_id in token_ids
+    ]
+    wait_for(web3_handler, tx_hashes)
+    report('transfer (single)', len(token_ids), started)
+
+    started = time.perf_counter()
+    batches = [token_ids[i:i + BATCH_SIZE] for i in range(0, len(token_ids), BATCH_SIZE)]
+    tx_hashes = [
+        send(web3_handler, web3_handler.transfer_batch_call(admin, buyer, batch, [10] * len(batch)))
+        for batch in batches
+    ]
+    wait_for(web3_handler, tx_hashes)
+    report(f'transfer (batches of {BATCH_SIZE})', len(token_ids), started)
+
+    started = time.perf_counter()
+    tx_hashes = [
+        send(web3_handler, web3_handler.contract.functions.retireCredits(token_id, 10))
+        for token_id in token_ids
+    ]
+    wait_for(web3_handler, tx_hashes)
+    report('retire', len(token_ids), started)
+
+    started = time.perf_counter()
+    for token_id in token_ids:
+        web3_handler.get_token_details(token_id)
+    report('metadata read', len(token_ids), started)
+    print(f"\nRead cache: {web3_handler.read_cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
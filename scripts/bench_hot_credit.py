@@ -0,0 +1,117 @@
+import os
+import django
+import sys
+import threading
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+# Needs Postgres: row-lock contention is what is being measured
+from django.db import connection, transaction
+from django.utils import timezone
+from grun.api.exceptions import InsufficientCreditsError
+from grun.api.models import User, CarbonCredit, CreditShard, Transaction
+from grun.api.services.inventory_service import InventoryService
+
+THREADS = int(os.environ.get('BENCH_THREADS', 32))
+PURCHASES = int(os.environ.get('BENCH_PURCHASES', 2000))
+SHARDS = int(os.environ.get('BENCH_SHARDS', 16))
+QUANTITY = Decimal('1.00')
+
+
+def create_listing(seller, total):
+    today = timezone.now().date()
+    return CarbonCredit.objects.create(
+        project_name=f'Hot credit {uuid.uuid4().hex[:8]}',
+        verifier='Bench',
+        owner=seller,
+        issuance_date=today,
+        expiry_date=today + timedelta(days=365),
+        total_credits=total,
+        available_credits=total,
+        status='VERIFIED',
+        price_per_credit=Decimal('10.00')
+    )
+
+
+def buy(credit, buyer, count, sold):
+    try:
+        for _ in range(count):
+            try:
+                with transaction.atomic():
+                    InventoryService.take(credit, QUANTITY)
+                    # Keeps the lock held across an insert, like a real purchase
+                    Transaction.objects.create(
+                        buyer=buyer,
+                        seller_id=credit.owner_id,
+                        carbon_credit=credit,
+                        quantity=QUANTITY,
+                        price_per_credit=credit.price_per_credit,
+                        total_amount=QUANTITY * credit.price_per_credit
+                    )
+                sold.append(QUANTITY)
+            except InsufficientCreditsError:
+                return
+    finally:
+        connection.close()
+
+
+def run(label, credit, buyer, total):
+    sold = []
+    per_thread = PURCHASES // THREADS
+    threads = [
+        threading.Thread(target=buy, args=(credit, buyer, per_thread, sold))
+        for _ in range(THREADS)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    if credit.shard_count:
+        InventoryService.fold(credit.pk)
+    credit.refresh_from_db()
+    sold_total = sum(sold, Decimal('0'))
+    print(f"{label:<24} {len(sold):>6} purchases  {elapsed:8.2f}s  {len(sold) / elapsed:10.1f} purchases/s")
+    assert credit.available_credits + sold_total == total, 'inventory does not add up'
+    assert sold_total <= total, 'oversold'
+
+
+def main():
+    suffix = uuid.uuid4().hex[:8]
+    seller = User.objects.create_user(username=f'bench-seller-{suffix}', role='SELLER')
+    buyer = User.objects.create_user(username=f'bench-buyer-{suffix}', role='BUYER')
+    total = Decimal(PURCHASES)
+    credits = []
+    try:
+        credit = create_listing(seller, total)
+        credits.append(credit)
+        run('single row', credit, buyer, total)
+
+        credit = InventoryService.shard(create_listing(seller, total), SHARDS)
+        credits.append(credit)
+        run(f'{SHARDS} shards', credit, buyer, total)
+
+        # Fewer credits than buyers: nobody may get more than was listed
+        scarce = Decimal(PURCHASES // 4)
+        credit = InventoryService.shard(create_listing(seller, scarce), SHARDS)
+        credits.append(credit)
+        run(f'{SHARDS} shards, sold out', credit, buyer, scarce)
+    finally:
+        Transaction.objects.filter(carbon_credit__in=credits).delete()
+        CreditShard.objects.filter(carbon_credit__in=credits).delete()
+        CarbonCredit.objects.filter(pk__in=[credit.pk for credit in credits]).delete()
+        seller.delete()
+        buyer.delete()
+
+
+if __name__ == '__main__':
+    main()
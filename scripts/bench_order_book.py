@@ -0,0 +1,64 @@
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The book is plain Python, so no Django setup or database is needed
+from grun.api.exchange.order_book import BookOrder, OrderBook
+
+OPERATIONS = int(os.environ.get('BENCH_OPERATIONS', 500000))
+CANCEL_RATIO = float(os.environ.get('BENCH_CANCEL_RATIO', 0.3))
+ROUNDS = int(os.environ.get('BENCH_ROUNDS', 3))
+# Ops per second the engine's throughput relies on; below it the script exits 1
+TARGET = int(os.environ.get('BENCH_TARGET', 200000))
+
+
+def workload(seed: int) -> list:
+    """Submits around a mid price of 20.00 and cancels of earlier submits, prepared up front"""
+    rng = random.Random(seed)
+    prices = [Decimal(cents) / 100 for cents in range(1900, 2101, 5)]
+    quantities = [Decimal(quantity) for quantity in range(1, 51)]
+    operations = []
+    submitted = []
+    for sequence in range(OPERATIONS):
+        if submitted and rng.random() < CANCEL_RATIO:
+            operations.append(('cancel', submitted.pop(rng.randrange(len(submitted)))))
+            continue
+        side = rng.choice(('BUY', 'SELL'))
+        operations.append(('submit', (sequence, rng.randrange(1000), side, rng.choice(prices), rng.choice(quantities))))
+        submitted.append(sequence)
+    return operations
+
+
+def run(operations) -> tuple:
+    book = OrderBook()
+    fills = 0
+    started = time.perf_counter()
+    for kind, args in operations:
+        if kind == 'submit':
+            order_id, user_id, side, price, quantity = args
+            fills += len(book.submit(BookOrder(order_id, user_id, side, price, quantity, order_id)))
+        else:
+            # Orders that already filled are no longer in the book
+            book.cancel(args)
+    return time.perf_counter() - started, fills, len(book.orders)
+
+
+def main():
+    operations = workload(seed=1)
+    best = None
+    for _ in range(ROUNDS):
+        elapsed, fills, resting = run(operations)
+        best = elapsed if best is None else min(best, elapsed)
+    rate = len(operations) / best
+    print(f"{len(operations)} ops ({CANCEL_RATIO:.0%} cancels)  {best:6.2f}s  {rate:10.0f} ops/s  "
+          f"{fills} fills  {resting} resting  target {TARGET} ops/s")
+    sys.exit(0 if rate >= TARGET else 1)
+
+
+if __name__ == '__main__':
+    main()
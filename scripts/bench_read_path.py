@@ -0,0 +1,108 @@
+import os
+import django
+import json
+import sys
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+# Seeds inside a transaction that is rolled back, so it can run against any Postgres database
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from grun.api.models import User, CarbonCredit, Transaction
+from grun.api.plans import ReadPlan
+from grun.api.renderers import ORJSONRenderer
+from grun.api.serializers import CarbonCreditSerializer, TransactionSerializer
+
+ROWS = int(os.environ.get('BENCH_ROWS', 1000))
+ROUNDS = int(os.environ.get('BENCH_ROUNDS', 5))
+
+
+class Rollback(Exception):
+    pass
+
+
+def seed():
+    suffix = uuid.uuid4().hex[:8]
+    owners = User.objects.bulk_create([
+        User(username=f'bench-{suffix}-owner-{i}', role='SELLER', organization_name=f'Org {i}') for i in range(ROWS)
+    ])
+    buyer = User.objects.create(username=f'bench-{suffix}-buyer', role='BUYER')
+    today = timezone.now().date()
+    credits = CarbonCredit.objects.bulk_create([
+        CarbonCredit(
+            project_name=f'Bench project {i}',
+            verifier='Verra',
+            owner=owner,
+            issuance_date=today,
+            expiry_date=today + timedelta(days=365),
+            total_credits=Decimal('1000.00'),
+            available_credits=Decimal('750.50'),
+            status='VERIFIED',
+            price_per_credit=Decimal('12.34')
+        )
+        for i, owner in enumerate(owners)
+    ])
+    Transaction.objects.bulk_create([
+        Transaction(
+            buyer=buyer,
+            seller_id=credit.owner_id,
+            carbon_credit=credit,
+            quantity=Decimal('2.00'),
+            price_per_credit=credit.price_per_credit,
+            total_amount=credit.price_per_credit * 2,
+            status='COMPLETED'
+        )
+        for credit in credits
+    ])
+    ids = [credit.pk for credit in credits]
+    return (
+        ('carbon credits', CarbonCredit.objects.filter(pk__in=ids).select_related('owner').order_by('-created_at', '-id'),
+         CarbonCreditSerializer),
+        ('transactions', Transaction.objects.filter(carbon_credit__in=ids)
+         .select_related('buyer', 'seller', 'carbon_credit__owner').order_by('-created_at', '-id'),
+         TransactionSerializer),
+    )
+
+
+def timed(render) -> tuple:
+    best = None
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        body = render()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, body
+
+
+def main():
+    try:
+        with transaction.atomic():
+            for label, queryset, serializer_class in seed():
+                plan = ReadPlan.for_serializer(serializer_class)
+                serializer_time, expected = timed(
+                    lambda: JSONRenderer().render(serializer_class(queryset.all(), many=True).data)
+                )
+                plan_time, actual = timed(
+                    lambda: ORJSONRenderer().render(plan.represent_many(queryset.values(*plan.columns)))
+                )
+                same = json.loads(expected) == json.loads(actual)
+                print(f"{label:<16} {ROWS} rows  serializer {serializer_time * 1000:8.1f} ms  "
+                      f"read plan {plan_time * 1000:8.1f} ms  {serializer_time / plan_time:4.1f}x  "
+                      f"{'same JSON' if same else 'JSON DIFFERS'}")
+                if not same:
+                    sys.exit(1)
+            raise Rollback()
+    except Rollback:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import os
+import django
+import sys
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+# Seeds inside a transaction that is rolled back, so it can run against any Postgres database
+from django.db import transaction
+from django.db.models import Max
+from django.test.utils import setup_test_environment
+from django.utils import timezone
+from rest_framework.test import APIClient
+from grun.api.models import User, CarbonCredit, Transaction, Document, Order
+from grun.api.testing import QueryBudgetExceeded, query_budget
+
+ROWS = 120
+PAGE_SIZES = (1, 100)
+
+# Queries per request whatever the page size; authentication is forced, so none are spent on it
+BUDGETS = [
+    ('/api/credits/', 1),
+    ('/api/listings/', 1),
+    ('/api/listings/search/', 2),  # facets, results
+    ('/api/transactions/', 1),
+    ('/api/documents/', 2),  # ETag aggregate, page
+    ('/api/orders/', 2),  # count, page
+]
+
+
+class Rollback(Exception):
+    pass
+
+
+def seed():
+    suffix = uuid.uuid4().hex[:8]
+    admin = User.objects.create(username=f'budget-{suffix}-admin', role='ADMIN')
+    buyers = User.objects.bulk_create([
+        User(username=f'budget-{suffix}-{i}', role='BUYER') for i in range(ROWS)
+    ])
+
+    today = timezone.now().date()
+    # One owner per credit, so a missing select_related costs a query per row
+    owners = User.objects.bulk_create([
+        User(username=f'budget-{suffix}-owner-{i}', role='SELLER') for i in range(ROWS)
+    ])
+    credits = CarbonCredit.objects.bulk_create([
+        CarbonCredit(
+            project_name=f'Budget project {i}',
+            verifier='Verra',
+            owner=owner,
+            issuance_date=today,
+            expiry_date=today + timedelta(days=365),
+            total_credits=Decimal(1000),
+            available_credits=Decimal(1000),
+            status='VERIFIED',
+            price_per_credit=Decimal(10)
+        )
+        for i, owner in enumerate(owners)
+    ])
+    Transaction.objects.bulk_create([
+        Transaction(
+            buyer=buyer,
+            seller_id=credit.owner_id,
+            carbon_credit=credit,
+            quantity=Decimal(1),
+            price_per_credit=credit.price_per_credit,
+            total_amount=credit.price_per_credit,
+            status='COMPLETED'
+        )
+        for buyer, credit in zip(buyers, credits)
+    ])
+    Document.objects.bulk_create([
+        Document(
+            carbon_credit=credit,
+            file_name='certificate.pdf',
+            file_type='application/pdf',
+            file_size=1024,
+            file_url='documents/certificate.pdf'
+        )
+        for credit in credits
+    ])
+    first_sequence = (Order.objects.aggregate(last=Max('sequence'))['last'] or 0) + 1
+    Order.objects.bulk_create([
+        Order(
+            user=admin,
+            carbon_credit=credit,
+            side='BUY',
+            price=Decimal(10),
+            quantity=Decimal(1),
+            remaining=Decimal(1),
+            sequence=first_sequence + i
+        )
+        for i, credit in enumerate(credits)
+    ])
+    return admin
+
+
+def main():
+    setup_test_environment()
+    failures = 0
+    try:
+        with transaction.atomic():
+            client = APIClient()
+            client.force_authenticate(seed())
+            for path, budget in BUDGETS:
+                for page_size in PAGE_SIZES:
+                    label = f'{path}?page_size={page_size}'
+                    try:
+                        with query_budget(budget, label) as context:
+                            response = client.get(path, {'page_size': page_size})
+                        ok = response.status_code == 200
+                        detail = f'{len(context)} queries' if ok else f'status {response.status_code}'
+                    except QueryBudgetExceeded as e:
+                        ok, detail = False, str(e)
+                    failures += not ok
+                    print(f"{'ok  ' if ok else 'FAIL'} {label:<40} budget {budget}  {detail}")
+            raise Rollback()
+    except Rollback:
+        pass
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
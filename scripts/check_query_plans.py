@@ -0,0 +1,186 @@
+import os
+import django
+import random
+import sys
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+# Add the project root directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+django.setup()
+
+# Seeds inside a transaction that is rolled back, so it can run against any Postgres database
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from grun.api.models import User, CarbonCredit, Transaction, Document, Payment
+
+SCALE = float(os.environ.get('PLAN_SCALE', 1))
+USERS = int(1000 * SCALE)
+CREDITS = int(200000 * SCALE)
+TRANSACTIONS = int(500000 * SCALE)
+DOCUMENTS = int(100000 * SCALE)
+PAYMENTS = int(100000 * SCALE)
+BATCH_SIZE = 5000
+
+
+class Rollback(Exception):
+    pass
+
+
+def bulk(model, rows):
+    for i in range(0, len(rows), BATCH_SIZE):
+        model.objects.bulk_create(rows[i:i + BATCH_SIZE])
+
+
+def spread_timestamps(queryset, column):
+    # auto_now_add stamps every seeded row with the same time; rows already in the database are left alone
+    meta = queryset.model._meta
+    sql, params = queryset.values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {meta.db_table} SET {column} = now() - random() * interval '730 days' "
+            f"WHERE {meta.pk.column} IN ({sql})",
+            params
+        )
+
+
+def seed():
+    suffix = uuid.uuid4().hex[:8]
+    users = [
+        User(username=f'plan-{suffix}-{i}', role='SELLER' if i % 4 == 0 else 'BUYER')
+        for i in range(USERS)
+    ]
+    bulk(User, users)
+    sellers = [user for user in users if user.role == 'SELLER']
+    buyers = [user for user in users if user.role == 'BUYER']
+
+    today = timezone.now().date()
+    credits = []
+    for i in range(CREDITS):
+        # Most credits are pending, retired or sold out; a few percent are on the market
+        status = random.choices(['VERIFIED', 'PENDING', 'RETIRED', 'REJECTED'], [10, 60, 25, 5])[0]
+        available = Decimal(random.randint(1, 1000)) if status == 'VERIFIED' and random.random() < 0.4 else Decimal(0)
+        credits.append(CarbonCredit(
+            project_name=f'Project {i}',
+            verifier=random.choice(['Verra', 'Gold Standard', 'ACR', 'CAR']),
+            owner=random.choice(sellers),
+            issuance_date=today,
+            expiry_date=today + timedelta(days=365),
+            total_credits=Decimal(1000),
+            available_credits=available,
+            status=status,
+            price_per_credit=Decimal(random.randint(5, 50))
+        ))
+    bulk(CarbonCredit, credits)
+
+    transactions = []
+    for _ in range(TRANSACTIONS):
+        credit = random.choice(credits)
+        transactions.append(Transaction(
+            buyer=random.choice(buyers),
+            seller_id=credit.owner_id,
+            carbon_credit=credit,
+            quantity=Decimal(10),
+            price_per_credit=credit.price_per_credit,
+            total_amount=Decimal(10) * credit.price_per_credit,
+            status=random.choices(['COMPLETED', 'PENDING', 'FAILED'], [85, 10, 5])[0]
+        ))
+    bulk(Transaction, transactions)
+
+    bulk(Document, [
+        Document(
+            carbon_credit=random.choice(credits),
+            file_name='certificate.pdf',
+            file_type='application/pdf',
+            file_size=1024,
+            file_url='documents/certificate.pdf',
+            status=random.choices(['APPROVED', 'REJECTED', 'PENDING'], [80, 15, 5])[0]
+        )
+        for _ in range(DOCUMENTS)
+    ])
+
+    bulk(Payment, [
+        Payment(
+            transaction=purchase,
+            payment_type='FIAT',
+            amount=purchase.total_amount,
+            fee_amount=purchase.total_amount * Decimal('0.02'),
+            total_amount=purchase.total_amount * Decimal('1.02'),
+            stripe_payment_intent=f'pi_{uuid.uuid4().hex}'
+        )
+        for purchase in random.sample(transactions, min(PAYMENTS, len(transactions)))
+    ])
+
+    spread_timestamps(CarbonCredit.objects.filter(owner__in=sellers), 'created_at')
+    spread_timestamps(Transaction.objects.filter(buyer__in=buyers), 'created_at')
+    spread_timestamps(Document.objects.filter(carbon_credit__owner__in=sellers), 'upload_date')
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return random.choice(sellers), random.choice(buyers)
+
+
+def explain(queryset) -> dict:
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        return cursor.fetchone()[0][0]['Plan']
+
+
+def index_names(plan: dict) -> set:
+    names = {plan['Index Name']} if 'Index Name' in plan else set()
+    for child in plan.get('Plans', []):
+        names |= index_names(child)
+    return names
+
+
+def hot_queries(seller, buyer):
+    listings = CarbonCredit.objects.filter(status='VERIFIED', available_credits__gt=0).order_by('-created_at', '-id')
+    # Same shape as KeysetPagination's filter for a page far down the list
+    deep = (list(listings[5000:5001]) or [listings.last()])[0]
+    deep_page = listings.filter(
+        Q(created_at__lt=deep.created_at) | Q(created_at=deep.created_at, pk__lt=deep.pk),
+        created_at__lte=deep.created_at
+    )
+    return [
+        ('listings, first page', listings[:21], 'credit_listing_idx'),
+        ('listings, deep cursor', deep_page[:21], 'credit_listing_idx'),
+        ("seller's credits", CarbonCredit.objects.filter(owner=seller).order_by('-created_at', '-id')[:21],
+         'credit_owner_created_idx'),
+        ('documents awaiting review', Document.objects.filter(status='PENDING').order_by('-upload_date', '-id')[:21],
+         'document_status_uploaded_idx'),
+        ("buyer's transactions", Transaction.objects.filter(buyer=buyer).order_by('-created_at', '-id')[:21],
+         'transaction_buyer_created_idx'),
+        ("seller's transactions", Transaction.objects.filter(seller=seller).order_by('-created_at', '-id')[:21],
+         'transaction_seller_created_idx'),
+        # What TransactionListView runs for anyone but an admin: both indexes, OR'd in a bitmap
+        ("user's transactions", Transaction.objects.select_related('buyer', 'seller', 'carbon_credit__owner')
+         .filter(Q(buyer=seller) | Q(seller=seller)).order_by('-created_at', '-id')[:21],
+         ('transaction_buyer_created_idx', 'transaction_seller_created_idx')),
+        ('stripe webhook lookup', Payment.objects.filter(stripe_payment_intent='pi_missing'), 'payment_intent_idx'),
+    ]
+
+
+def main():
+    failures = 0
+    try:
+        with transaction.atomic():
+            seller, buyer = seed()
+            for label, queryset, expected in hot_queries(seller, buyer):
+                expected = (expected,) if isinstance(expected, str) else expected
+                plan = explain(queryset)
+                used = index_names(plan)
+                ok = used.issuperset(expected)
+                failures += not ok
+                print(f"{'ok  ' if ok else 'FAIL'} {label:<28} cost {plan['Total Cost']:>10.1f}  "
+                      f"expected {', '.join(expected)}, used {', '.join(sorted(used)) or 'no index'}")
+            raise Rollback()
+    except Rollback:
+        pass
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -54,6 +54,37 @@ describe("CarbonCredit", function () {
           .mintCredit("Test", "Test", expiryDate, 100, "ipfs://test")
       ).to.be.revertedWith("Must be minter or verified seller");
     });
+
+    it("Should mint several credits in one batch", async function () {
+      const expiryDate = Math.floor(Date.now() / 1000) + 365 * 24 * 60 * 60;
+
+      await expect(
+        carbonCredit
+          .connect(seller)
+          .mintCreditBatch(
+            ["Project A", "Project B"],
+            ["Verifier A", "Verifier B"],
+            [expiryDate, expiryDate],
+            [100, 200],
+            ["ipfs://a", "ipfs://b"]
+          )
+      )
+        .to.emit(carbonCredit, "CreditMinted")
+        .withArgs(2, "Project B", seller.address, 200);
+
+      expect(await carbonCredit.balanceOf(seller.address, 1)).to.equal(100);
+      expect(await carbonCredit.balanceOf(seller.address, 2)).to.equal(200);
+    });
+
+    it("Should reject batches with mismatched lengths", async function () {
+      const expiryDate = Math.floor(Date.now() / 1000) + 365 * 24 * 60 * 60;
+
+      await expect(
+        carbonCredit
+          .connect(seller)
+          .mintCreditBatch(["A"], ["A"], [expiryDate], [100, 200], ["ipfs://a"])
+      ).to.be.revertedWith("Array length mismatch");
+    });
   });
 
   describe("Transfers", function () {